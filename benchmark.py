@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import mock_portal
+from concurrency import tree_rss_bytes
+from timing import percentile
+
+# End-to-end throughput benchmark against the local mock portal.
+#
+#   python -m benchmark --concurrency 1,2,4,8 --drafts 40 --latency-ms 30
+#   python -m benchmark --compare
+#   python -m benchmark --blocking both   # with and without resource blocking
+#
+# For every concurrency level the portal is reset, the headless CLI runs in a
+# fresh working directory (so no saved session or journal carries over), and
+# the run reports drafts/minute, p50/p95 per-draft latency from the timing
+# trace and the peak RSS of the CLI plus its browser processes. Results are
+# appended to a JSONL file with a label (the git revision by default), so
+# code versions can be compared with --compare.
+#
+#   python -m benchmark --import-time
+#
+# guards cold start instead: every entry module is imported in a fresh
+# interpreter with -X importtime, and the run fails when one takes longer than
+# the budget or pulls in the browser, GUI or LLM libraries at import time.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = "bench_results.jsonl"
+RSS_SAMPLE_INTERVAL = 0.2
+
+IMPORT_MODULES = ["cli", "new_app", "main", "old", "sharding", "browser_server", "mock_portal"]
+HEAVY_MODULES = ["playwright", "PySimpleGUI", "google.generativeai"]
+IMPORT_BUDGET_MS = 300  # cold imports measured 96-153 ms here; leaves room for slower machines
+IMPORT_REPEATS = 5
+
+
+# function to name the code version under test
+def git_label():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# function to run the headless CLI once and measure it
+def run_once(base_url, concurrency, workdir, extra_args=()):
+    accounts_path = os.path.join(workdir, "accounts.csv")
+    trace_path = os.path.join(workdir, "trace.json")
+    with open(accounts_path, "w", encoding="utf-8") as f:
+        f.write("bench@example.com,benchmark\n")
+
+    env = dict(os.environ, TRAC_BASE_URL=base_url, PYTHONPATH=REPO_DIR)
+    command = [
+        sys.executable, "-m", "cli", "run",
+        # the same value as the cap, so the adaptive limit cannot move away from the level under test
+        "--accounts", accounts_path, "--concurrency", str(concurrency), "--max-concurrency", str(concurrency),
+        "--trace", trace_path, *extra_args,
+    ]
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    peak_rss = 0
+    while process.poll() is None:
+        if os.path.isdir("/proc"):
+            peak_rss = max(peak_rss, tree_rss_bytes(process.pid))
+        time.sleep(RSS_SAMPLE_INTERVAL)
+    wall = time.perf_counter() - started
+    stderr = process.stderr.read().decode("utf-8", "replace")
+
+    if process.returncode != 0 or not os.path.exists(trace_path):
+        raise RuntimeError(f"CLI exited with {process.returncode}: {stderr.strip()[-500:]}")
+
+    with open(trace_path, encoding="utf-8") as f:
+        trace = json.load(f)["traceEvents"]
+    draft_spans = [event for event in trace if event.get("ph") == "X" and event["name"] == "draft"]
+    durations = sorted(event["dur"] / 1_000_000 for event in draft_spans)
+
+    return {
+        "concurrency": concurrency,
+        "drafts": len(draft_spans),
+        "failed": sum(1 for event in draft_spans if not event["args"].get("ok", True)),
+        "wall_s": round(wall, 2),
+        "drafts_per_min": round(len(draft_spans) / wall * 60, 1) if wall else 0.0,
+        "p50_s": round(percentile(durations, 0.50), 2),
+        "p95_s": round(percentile(durations, 0.95), 2),
+        "peak_rss_mb": round(peak_rss / 1_000_000, 1),
+    }
+
+
+# function to import a module in a fresh interpreter; returns the best cumulative
+# import time and which heavy libraries it loaded
+def measure_import(module, repeats=IMPORT_REPEATS):
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    best_us = None
+    heavy = ""
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe], cwd=REPO_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed: {result.stderr.strip()[-500:]}")
+        # lines look like "import time:   self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative = int(fields[1])
+                best_us = cumulative if best_us is None else min(best_us, cumulative)
+        heavy = result.stdout.strip()
+
+    return {"module": module, "import_ms": round((best_us or 0) / 1000, 1), "heavy": heavy or "-"}
+
+
+# function to check every entry module against the import budget
+def check_imports(budget_ms=IMPORT_BUDGET_MS):
+    rows = [measure_import(module) for module in IMPORT_MODULES]
+    print_table(rows, ["module", "import_ms", "heavy"])
+    failures = [row for row in rows if row["import_ms"] > budget_ms or row["heavy"] != "-"]
+    for row in failures:
+        print(f"{row['module']}: {row['import_ms']} ms (budget {budget_ms} ms), heavy imports: {row['heavy']}")
+    return 1 if failures else 0
+
+
+# function to print results as a table
+def print_table(rows, columns=None):
+    columns = columns or ["label", "concurrency", "blocking", "drafts", "failed", "wall_s", "drafts_per_min", "p50_s", "p95_s", "peak_rss_mb"]
+    widths = {column: max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(f"{column:>{widths[column]}}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{str(row.get(column, '')):>{widths[column]}}" for column in columns))
+
+
+# function to show every stored result grouped by code version
+def compare(results_path):
+    if not os.path.exists(results_path):
+        print(f"No results in {results_path}")
+        return
+    with open(results_path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    rows.sort(key=lambda row: (row["concurrency"], row.get("blocking", "on"), row["ts"]))
+    print_table(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Throughput benchmark against mock_portal")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma separated tab counts to try")
+    parser.add_argument("--drafts", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--label", default=None, help="name of the code version (default: git describe)")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSONL file the results are appended to")
+    parser.add_argument("--compare", action="store_true", help="print the stored results and exit")
+    parser.add_argument("--blocking", choices=["on", "off", "both"], default="on",
+                        help="run with resource blocking, without it, or both ways at every level")
+    parser.add_argument("--import-time", action="store_true",
+                        help="check the cold import time of the entry modules and exit")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(args.results)
+        return 0
+    if args.import_time:
+        return check_imports(args.import_budget_ms)
+
+    label = args.label or git_label()
+    server, base_url = mock_portal.start_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, drafts=args.drafts,
+    )
+
+    rows = []
+    blocking_modes = ["on", "off"] if args.blocking == "both" else [args.blocking]
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(",") if level.strip()]:
+            for blocking in blocking_modes:
+                mock_portal.reset_state(args.drafts)
+                extra_args = ["--no-block-resources"] if blocking == "off" else []
+                with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+                    row = dict(run_once(base_url, concurrency, workdir, extra_args),
+                               blocking=blocking, label=label, ts=round(time.time()))
+                rows.append(row)
+                print_table([row])
+                with open(args.results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(row) + "\n")
+    finally:
+        server.shutdown()
+
+    print()
+    print_table(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from concurrency import tree_rss_bytes
+
+# Long-lived warm browser shared by runs.
+#
+#   python -m browser_server serve [--headed]   # keep a Chromium running
+#   python -m browser_server status
+#   python -m browser_server stop
+#
+# Python Playwright has no launch_server, so this starts Playwright's own
+# Chromium with a remote debugging port and runs attach to it with
+# connect_over_cdp. A run then only creates fresh contexts instead of paying
+# for a cold browser start. The endpoint is written to STATE_PATH, where
+# server_endpoint() finds it. The browser is replaced once it is older than
+# MAX_BROWSER_AGE or its process tree uses more than MAX_BROWSER_RSS_BYTES,
+# but only while no run has pages open in it. Runs fall back to launching
+# their own browser when no server answers.
+#
+# Security: the remote debugging port has no authentication. Any process on
+# this machine that can reach 127.0.0.1:PORT, including other users' processes,
+# gets full control of the browser: it can read the cookies of every logged-in
+# account, open pages as those accounts and run scripts in them. Only serve on
+# a single-user machine. Runs therefore attach only when asked to
+# (USE_BROWSER_SERVER=1 or --browser-server), and only through a state file
+# that belongs to the current user and that nobody else can write; otherwise
+# another user could point runs at a browser of their choosing.
+
+STATE_PATH = "browser_server.json"
+DEFAULT_PORT = 9333
+MAX_BROWSER_AGE = 6 * 3600
+MAX_BROWSER_RSS_BYTES = 2 * 1024 * 1024 * 1024
+CHECK_INTERVAL = 30
+STARTUP_TIMEOUT = 20
+
+
+# function to ask the DevTools HTTP interface for JSON, or None when it does not answer
+def devtools_json(port, path, timeout=2):
+    import urllib.request  # runs that never find a server do not load the HTTP client
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+            return json.load(response)
+    except Exception:
+        return None
+
+
+# function to tell whether an open state file is owned by the current user and not
+# writable by anyone else (Windows has no owner bits to check)
+def state_file_trusted(f):
+    if not hasattr(os, "getuid"):
+        return True
+    info = os.fstat(f.fileno())
+    return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+# function to read the state file, or None when it is missing, broken or not trusted
+def read_state(path=STATE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            if not state_file_trusted(f):
+                print(f"Ignoring {path}: it must belong to you and not be writable by others", file=sys.stderr)
+                return None
+            state = json.load(f)
+        return state if isinstance(state, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+# function to find the endpoint of a running server, or None; BROWSER_ENDPOINT overrides the state file
+def server_endpoint(path=STATE_PATH):
+    if os.environ.get("BROWSER_ENDPOINT"):
+        return os.environ["BROWSER_ENDPOINT"]
+    port = (read_state(path) or {}).get("port")
+    if not isinstance(port, int):
+        return None
+    return f"http://127.0.0.1:{port}" if devtools_json(port, "/json/version") else None
+
+
+# function to locate the Chromium build Playwright installed
+def chromium_executable():
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+# function to start Chromium and wait until its DevTools endpoint answers
+def start_browser(executable, port, headless):
+    profile_dir = tempfile.mkdtemp(prefix="browser_server_")
+    command = [
+        executable, f"--remote-debugging-port={port}", f"--user-data-dir={profile_dir}",
+        "--no-first-run", "--no-default-browser-check", "about:blank",
+    ]
+    if headless:
+        command.insert(1, "--headless=new")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while devtools_json(port, "/json/version") is None:
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_browser({"process": process, "profile_dir": profile_dir})
+            raise RuntimeError(f"Chromium did not open port {port}")
+        time.sleep(0.2)
+
+    # the start page does not count as a run using the browser
+    start_pages = {target["id"] for target in devtools_json(port, "/json/list") or [] if target["type"] == "page"}
+    return {"process": process, "profile_dir": profile_dir, "started": time.time(), "start_pages": start_pages}
+
+
+def stop_browser(browser):
+    browser["process"].terminate()
+    try:
+        browser["process"].wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        browser["process"].kill()
+    shutil.rmtree(browser["profile_dir"], ignore_errors=True)
+
+
+# function to tell whether a run currently has pages open in the browser
+def browser_in_use(port, browser):
+    targets = devtools_json(port, "/json/list")
+    if targets is None:
+        return True  # unsure, so do not recycle now
+    return any(target["type"] == "page" and target["id"] not in browser["start_pages"] for target in targets)
+
+
+# function to give the reason the browser should be replaced, or None
+def recycle_reason(browser):
+    age = time.time() - browser["started"]
+    if age > MAX_BROWSER_AGE:
+        return f"running for {age / 3600:.1f} h"
+    if os.path.isdir("/proc"):
+        rss = tree_rss_bytes(browser["process"].pid)
+        if rss > MAX_BROWSER_RSS_BYTES:
+            return f"using {rss // (1024 * 1024)} MB"
+    return None
+
+
+def write_state(path, port, browser):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # a file left from an older server may have wider permissions
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "port": port, "browser_pid": browser["process"].pid,
+                   "started": browser["started"]}, f)
+
+
+# function to keep a warm browser running until stopped
+def serve(port=DEFAULT_PORT, headless=True, path=STATE_PATH):
+    # SIGTERM (from "stop") unwinds through the finally below
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    executable = chromium_executable()
+    browser = start_browser(executable, port, headless)
+    write_state(path, port, browser)
+    print(f"Browser server on http://127.0.0.1:{port} (pid {browser['process'].pid})", flush=True)
+
+    try:
+        while True:
+            time.sleep(CHECK_INTERVAL)
+            if browser["process"].poll() is not None:
+                reason = f"exited with code {browser['process'].returncode}"
+            else:
+                reason = recycle_reason(browser)
+                if reason and browser_in_use(port, browser):
+                    continue  # wait until the current run is done
+            if reason:
+                print(f"Recycling browser: {reason}", flush=True)
+                stop_browser(browser)
+                browser = start_browser(executable, port, headless)
+                write_state(path, port, browser)
+    finally:
+        stop_browser(browser)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m browser_server", description="Warm browser shared by runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="start the browser and keep it running")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--headed", action="store_true", help="show the browser window")
+    commands.add_parser("status", help="print the endpoint of the running server")
+    commands.add_parser("stop", help="stop the running server")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.port, headless=not args.headed)
+        return 0
+
+    endpoint = server_endpoint()
+    if args.command == "status":
+        print(endpoint or "No browser server running")
+        return 0 if endpoint else 1
+
+    state = read_state()
+    try:
+        os.kill(state["pid"], signal.SIGTERM)
+    except (OSError, TypeError, KeyError) as e:
+        print(f"No browser server to stop: {e!r}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
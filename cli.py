@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import sys
+
+import generation
+import new_app
+import status_bus
+
+# Headless entry point for servers:
+#
+#   python -m cli run --accounts accounts.csv --concurrency 8
+#
+# Drives new_app.run_automation directly, never imports the GUI toolkit and
+# prints one JSON object per status event on stdout.
+
+
+# sink that prints every status event as one JSON line
+def emit_json(event):
+    line = dict(event, ts=round(event["ts"], 3), remaining=new_app.remaining_drafts)
+    sys.stdout.write(json.dumps(line, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+# function to run the automation from the command line
+def run(args):
+    accounts = new_app.load_accounts(args.accounts)
+    if not accounts:
+        print(f"No accounts found in {args.accounts}", file=sys.stderr)
+        return 2
+
+    new_app.BLOCK_RESOURCES = not args.no_block_resources
+    new_app.INCREMENTAL_DISCOVERY = not args.full_discovery
+    if args.browser_server:
+        new_app.USE_BROWSER_SERVER = True
+    if args.trace:
+        new_app.TRACE_PATH = args.trace
+    if args.resume:
+        new_app.RESUME_PATH = args.resume
+    if args.generation_backend:
+        generation.BACKEND = args.generation_backend
+    status_bus.sinks.append(emit_json)
+    if args.events_log:
+        status_bus.sinks.append(status_bus.jsonl_sink(args.events_log))
+
+    if args.processes > 1:
+        # imported here so single-process runs do not load multiprocessing
+        import sharding
+
+        sharding.run_sharded(
+            accounts, args.processes, args.concurrency, headless=not args.headed, max_concurrency=args.max_concurrency,
+        )
+        return 0
+
+    asyncio.run(new_app.run_automation(
+        accounts, args.concurrency, headless=not args.headed, max_concurrency=args.max_concurrency,
+    ))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Job application automation without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="process the drafts of every account in a file")
+    run_parser.add_argument("--accounts", required=True, help="CSV file with one 'email,password' per line")
+    run_parser.add_argument("--concurrency", type=int, default=new_app.DEFAULT_CONCURRENCY,
+                            help="starting number of tabs shared by all accounts")
+    run_parser.add_argument("--max-concurrency", type=int, default=new_app.MAX_CONCURRENCY,
+                            help="upper bound for the adaptive tab limit (set equal to --concurrency to fix it)")
+    run_parser.add_argument("--processes", type=int, default=1,
+                            help="worker processes, each with its own browser; the tab limits are split between them")
+    run_parser.add_argument("--headed", action="store_true", help="show the browser window")
+    run_parser.add_argument("--no-block-resources", action="store_true",
+                            help="let images, fonts, media and analytics requests through")
+    run_parser.add_argument("--browser-server", action="store_true",
+                            help="attach to browser_server.py when it is running (its debugging port is "
+                                 "unauthenticated: single-user machines only)")
+    run_parser.add_argument("--full-discovery", action="store_true",
+                            help="walk every draft list page instead of stopping at drafts unchanged since the last run")
+    run_parser.add_argument("--events-log", help="also append every status event to this JSONL file")
+    run_parser.add_argument("--trace", help="write the timing spans to this Chrome-trace JSON file")
+    run_parser.add_argument("--resume", help="text file with the resume; enables supporting document generation")
+    run_parser.add_argument("--generation-backend", choices=sorted(generation.BACKENDS),
+                            help="model used for supporting documents (default: gemini)")
+    run_parser.set_defaults(handler=run)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Adaptive tab limit (AIMD).
+#
+# The limit starts at the configured tab count. After every full window of
+# healthy drafts (as many successes as the current limit) it grows by one.
+# A failed draft, an HTTP 429/5xx response, latency well above the best
+# latency seen so far, or a machine at its CPU/RAM ceiling halves it instead,
+# at most once per typical draft duration so one burst of errors only counts
+# once. The limit never grows while the machine is at its ceiling. Every
+# change goes to on_change(old, new, reason) so it shows up in the status view.
+
+INCREASE_STEP = 1
+DECREASE_FACTOR = 0.5
+LATENCY_FACTOR = 2.0  # smoothed latency this many times the baseline counts as congestion
+LATENCY_SMOOTHING = 0.3
+BASELINE_DRIFT = 0.05  # lets the baseline follow a portal that is slower for good
+MIN_LATENCY_SAMPLES = 3
+DEFAULT_COOLDOWN = 5.0  # seconds between decreases until draft latency is known
+
+MAX_LOAD_PER_CPU = 1.5
+MIN_FREE_MEMORY_BYTES = 400 * 1024 * 1024  # roughly two more Chromium tabs
+
+
+# function to read the available memory from /proc/meminfo (Linux), or None
+def available_memory_bytes():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# function to sum the resident memory of a process and all its descendants (Linux)
+def tree_rss_bytes(root_pid):
+    parents = {}
+    rss_pages = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/statm") as f:
+                rss_pages[int(entry)] = int(f.read().split()[1])
+            parents[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total = 0
+    for pid in rss_pages:
+        current = pid
+        while current and current != root_pid:
+            current = parents.get(current)
+        if current == root_pid:
+            total += rss_pages[pid]
+    return total * os.sysconf("SC_PAGE_SIZE")
+
+
+# function to describe why the machine cannot take more tabs, or None when it can
+def resource_pressure():
+    try:
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        if load > MAX_LOAD_PER_CPU:
+            return f"CPU load {load:.1f} per core"
+    except (AttributeError, OSError):
+        pass
+
+    available = available_memory_bytes()
+    if available is not None and available < MIN_FREE_MEMORY_BYTES:
+        return f"only {available // (1024 * 1024)} MB memory free"
+    return None
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial, minimum=1, maximum=None, on_change=None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.on_change = on_change
+        self.active = 0
+        self.successes = 0
+        self.samples = 0
+        self.smoothed = None
+        self.baseline = None
+        self.last_decrease = 0.0
+        self.condition = None
+
+    def set_limit(self, limit, reason):
+        limit = min(max(limit, self.minimum), self.maximum)
+        if limit == self.limit:
+            return
+        old, self.limit = self.limit, limit
+        if self.on_change:
+            self.on_change(old, limit, reason)
+
+    # function to halve the limit, once per draft duration
+    def back_off(self, reason):
+        now = time.monotonic()
+        if now - self.last_decrease < (self.smoothed or DEFAULT_COOLDOWN):
+            return
+        self.last_decrease = now
+        self.successes = 0
+        self.set_limit(int(self.limit * DECREASE_FACTOR), reason)
+
+    # function to feed one finished draft into the controller
+    def record(self, ok, latency=None):
+        if not ok:
+            self.back_off("draft failed")
+            return
+
+        if latency is not None:
+            self.samples += 1
+            if self.smoothed is None:
+                self.smoothed = self.baseline = latency
+            else:
+                self.smoothed += (latency - self.smoothed) * LATENCY_SMOOTHING
+                self.baseline = min(self.smoothed, self.baseline + (self.smoothed - self.baseline) * BASELINE_DRIFT)
+
+            if self.samples >= MIN_LATENCY_SAMPLES and self.smoothed > self.baseline * LATENCY_FACTOR:
+                self.back_off(f"draft latency {self.smoothed:.1f}s vs {self.baseline:.1f}s")
+                return
+
+        pressure = resource_pressure()
+        if pressure:
+            self.back_off(pressure)
+            return
+
+        self.successes += 1
+        if self.successes >= self.limit:
+            self.successes = 0
+            self.set_limit(self.limit + INCREASE_STEP, f"{self.limit} healthy drafts in a row")
+
+    # Playwright "response" handler: throttling and server errors mean back off
+    def observe_response(self, response):
+        if response.status == 429 or response.status >= 500:
+            self.back_off(f"HTTP {response.status} from {response.url}")
+
+    async def acquire(self):
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    # function to free a slot; ok=None frees it without counting a draft
+    async def release(self, ok=None, latency=None):
+        async with self.condition:
+            self.active -= 1
+            if ok is not None:
+                self.record(ok, latency)
+            self.condition.notify_all()
+
+    # context manager form: set item["ok"] = False to count a failure
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        item = {"ok": True}
+        started = time.perf_counter()
+        try:
+            yield item
+        except BaseException:
+            item["ok"] = False
+            raise
+        finally:
+            await self.release(item["ok"], time.perf_counter() - started)
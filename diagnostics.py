@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import itertools
+import os
+import re
+import time
+
+# Failure diagnostics.
+#
+# Instead of full-page PNGs on the hot path, a capture is a compressed
+# viewport JPEG plus (optionally) a gzipped DOM snapshot. Only the two quick
+# browser calls happen inline. Compressing and writing the files runs in a
+# worker thread in the background, and flush() waits for the writes at the
+# end of a run. Every capture gets a unique path under
+# diagnostics/<run>/<account>/, and the oldest files are deleted once the
+# directory grows past DIAGNOSTICS_BUDGET_BYTES. Successful steps are not
+# captured unless CAPTURE_ON_SUCCESS is set.
+
+DIAGNOSTICS_DIR = "diagnostics"
+DIAGNOSTICS_BUDGET_BYTES = 200 * 1024 * 1024
+JPEG_QUALITY = 60
+CAPTURE_DOM = True
+CAPTURE_ON_SUCCESS = False
+
+run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+counter = itertools.count(1)
+pending_writes = set()
+
+
+# function to make a string safe to use in a file name
+def slug(text, limit=60):
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(text)).strip("_")[-limit:] or "capture"
+
+
+# function to build a unique base path for one capture
+def capture_base(app_id, label, reason):
+    folder = os.path.join(DIAGNOSTICS_DIR, run_id, slug(app_id))
+    return os.path.join(folder, f"{next(counter):05d}_{slug(reason, 30)}_{slug(label)}")
+
+
+# function to write a capture to disk and keep the directory under budget
+def write_capture(base, image, dom):
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    if image:
+        with open(f"{base}.jpg", "wb") as f:
+            f.write(image)
+    if dom:
+        with open(f"{base}.html.gz", "wb") as f:
+            f.write(gzip.compress(dom.encode("utf-8"), compresslevel=5))
+    enforce_budget()
+
+
+# function to delete the oldest captures once the budget is exceeded
+def enforce_budget(root=DIAGNOSTICS_DIR, budget=None):
+    budget = DIAGNOSTICS_BUDGET_BYTES if budget is None else budget
+    files = []
+    for folder, _dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _mtime, size, _path in files)
+    for _mtime, size, path in sorted(files):
+        if total <= budget:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# function to capture a page on failure without holding up the tab
+async def capture(page, app_id, label, reason, failed=True):
+    if not failed and not CAPTURE_ON_SUCCESS:
+        return None
+
+    base = capture_base(app_id, label, reason)
+    try:
+        image = await page.screenshot(type="jpeg", quality=JPEG_QUALITY, full_page=False, timeout=5000)
+        dom = await page.content() if CAPTURE_DOM else None
+    except Exception:
+        return None
+
+    task = asyncio.ensure_future(asyncio.to_thread(write_capture, base, image, dom))
+    pending_writes.add(task)
+    task.add_done_callback(pending_writes.discard)
+    return base
+
+
+# function for the sync Playwright API (main.py); the write happens inline there
+def capture_sync(page, app_id, label, reason, failed=True):
+    if not failed and not CAPTURE_ON_SUCCESS:
+        return None
+
+    base = capture_base(app_id, label, reason)
+    try:
+        image = page.screenshot(type="jpeg", quality=JPEG_QUALITY, full_page=False, timeout=5000)
+        dom = page.content() if CAPTURE_DOM else None
+        write_capture(base, image, dom)
+    except Exception:
+        return None
+    return base
+
+
+# function to wait for background writes before the run ends
+async def flush():
+    if pending_writes:
+        await asyncio.gather(*list(pending_writes), return_exceptions=True)
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import weakref
+from functools import lru_cache
+
+# Supporting-document generation stage.
+#
+# The LLM call is blocking, so it runs in a worker thread and never stalls
+# the event loop (and with it every open tab). Calls are limited to
+# MAX_CONCURRENT_GENERATIONS at a time and spaced at least
+# MIN_SECONDS_BETWEEN_CALLS apart. Results are cached on disk under a hash of
+# (resume, job description, prompt template), and identical requests that
+# are already running share one call. Backends are plain blocking functions
+# prompt -> text, chosen by name, so runs can use the local "fake" backend.
+
+GENERATED_DIR = "generated"
+MAX_CONCURRENT_GENERATIONS = 2
+MIN_SECONDS_BETWEEN_CALLS = 1.0
+GEMINI_MODEL = "gemini-2.5-pro"
+BACKEND = os.environ.get("SUPPORTING_DOC_BACKEND", "gemini")
+
+DEFAULT_PROMPT_TEMPLATE = """Write the supporting information section of a job application.
+Use only experience that appears in the resume, match it to the job description,
+and keep it under 1,000 words in a professional first-person tone.
+
+Resume:
+{resume}
+
+Job description:
+{job_description}
+"""
+
+
+@lru_cache(maxsize=None)
+def gemini_model(model_name):
+    # imported on first use so runs that never generate do not pay for it
+    import google.generativeai as genai
+
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key:
+        genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+# backend that calls Gemini (blocking)
+def gemini_backend(prompt):
+    return gemini_model(GEMINI_MODEL).generate_content(prompt).text
+
+
+# backend for offline runs and benchmarks: echoes a deterministic document
+def fake_backend(prompt):
+    time.sleep(0.05)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"Supporting information (fake backend, {digest})\n\n{prompt[-500:]}"
+
+
+BACKENDS = {"gemini": gemini_backend, "fake": fake_backend}
+
+# per event loop: concurrency limit, rate limit state and in-flight requests
+loop_state = weakref.WeakKeyDictionary()
+
+
+def state_for_loop():
+    loop = asyncio.get_running_loop()
+    if loop not in loop_state:
+        loop_state[loop] = {
+            "semaphore": asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS),
+            "rate_lock": asyncio.Lock(),
+            "last_call": 0.0,
+            "in_flight": {},
+        }
+    return loop_state[loop]
+
+
+# function to key a generation on everything that affects its output
+def generation_key(resume, job_description, prompt_template):
+    payload = json.dumps([resume, job_description, prompt_template], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_cached(key):
+    try:
+        with open(os.path.join(GENERATED_DIR, f"{key}.txt"), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached(key, text):
+    os.makedirs(GENERATED_DIR, exist_ok=True)
+    path = os.path.join(GENERATED_DIR, f"{key}.txt")
+    temp_path = f"{path}.{os.getpid()}.tmp"  # unique per process when several share the cache
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+# function to wait for a free slot that also respects the call spacing
+async def wait_for_rate_limit(state):
+    async with state["rate_lock"]:
+        loop = asyncio.get_running_loop()
+        wait = state["last_call"] + MIN_SECONDS_BETWEEN_CALLS - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        state["last_call"] = loop.time()
+
+
+async def run_generation(key, prompt, backend):
+    state = state_for_loop()
+    async with state["semaphore"]:
+        await wait_for_rate_limit(state)
+        text = await asyncio.to_thread(backend, prompt)
+    await asyncio.to_thread(write_cached, key, text)
+    return text
+
+
+# function to generate (or reuse) a supporting document without blocking the loop
+async def generate_supporting_document(resume, job_description, prompt_template=DEFAULT_PROMPT_TEMPLATE, backend=None):
+    if not resume.strip() or not job_description.strip():
+        raise ValueError("Resume and job description must not be empty.")
+
+    key = generation_key(resume, job_description, prompt_template)
+    cached = await asyncio.to_thread(read_cached, key)
+    if cached is not None:
+        return cached
+
+    state = state_for_loop()
+    if key not in state["in_flight"]:
+        backend = backend or BACKENDS[BACKEND]
+        prompt = prompt_template.format(resume=resume, job_description=job_description)
+        task = asyncio.ensure_future(run_generation(key, prompt, backend))
+        task.add_done_callback(lambda _: state["in_flight"].pop(key, None))
+        state["in_flight"][key] = task
+
+    # shield so one cancelled caller does not cancel the call others wait on
+    return await asyncio.shield(state["in_flight"][key])
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+
+# On-disk job description store keyed by vacancy.
+#
+# Many drafts belong to the same vacancy, so the description is fetched once
+# and then reused by every draft, the section fillers and the supporting
+# document generator. Each entry is a small text file; reading an entry
+# refreshes its modification time and the least recently used files are
+# removed once the store grows past JD_CACHE_MAX_ENTRIES. A small in-memory
+# map in front of the files avoids re-reading hot entries.
+
+JD_CACHE_DIR = "jd_cache"
+JD_CACHE_MAX_ENTRIES = 500
+
+memory = {}
+memory_lock = threading.Lock()
+
+
+# function to map a vacancy key to its cache file
+def cache_path(key, cache_dir=JD_CACHE_DIR):
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(cache_dir, f"{digest}.txt")
+
+
+# function to read a cached job description, or None when it is not stored
+def get_job_description(key, cache_dir=JD_CACHE_DIR):
+    with memory_lock:
+        if key in memory:
+            return memory[key]
+
+    path = cache_path(key, cache_dir)
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path)  # mark as recently used
+    except OSError:
+        return None
+
+    with memory_lock:
+        memory[key] = text
+    return text
+
+
+# function to store a job description and evict the least recently used entries
+def store_job_description(key, text, cache_dir=JD_CACHE_DIR, max_entries=JD_CACHE_MAX_ENTRIES):
+    with memory_lock:
+        memory[key] = text
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(key, cache_dir)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+    evict(cache_dir, max_entries)
+
+
+# function to drop the oldest entries once the store is over its limit
+def evict(cache_dir=JD_CACHE_DIR, max_entries=JD_CACHE_MAX_ENTRIES):
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".txt")]
+    except OSError:
+        return
+    if len(entries) <= max_entries:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    # the memory map is only a front for the files, so start it afresh
+    with memory_lock:
+        memory.clear()
@@ -0,0 +1,187 @@
+import queue
+import sqlite3
+import threading
+import time
+
+# Append-only progress journal.
+#
+# Every state change of a draft (started, section done, draft done, draft
+# failed) is appended as a row to a SQLite database in WAL mode. Rows are
+# handed to a background writer thread through a queue, so recording progress
+# never blocks the asyncio loop. On restart, load_progress() tells the runner
+# which drafts and sections are already finished.
+#
+# The same database keeps an index of every draft seen on the application
+# list with a marker of its list entry (which includes the last-updated
+# time), so discovery can stop at the first draft that has not changed since
+# the previous run (see new_app.feed_drafts). The index is only trusted when
+# the discovery that wrote it walked the whole list: pages an interrupted
+# discovery never reached are missing from it.
+
+JOURNAL_PATH = "progress.db"
+
+STARTED = "started"
+SECTION_DONE = "section_done"
+DRAFT_DONE = "draft_done"
+DRAFT_FAILED = "draft_failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    app_id TEXT NOT NULL,
+    draft_url TEXT NOT NULL,
+    section TEXT,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS progress_draft ON progress (app_id, draft_url);
+CREATE TABLE IF NOT EXISTS draft_index (
+    app_id TEXT NOT NULL,
+    draft_url TEXT NOT NULL,
+    marker TEXT NOT NULL,
+    seen_ts REAL NOT NULL,
+    PRIMARY KEY (app_id, draft_url)
+);
+CREATE TABLE IF NOT EXISTS discovery_state (
+    app_id TEXT PRIMARY KEY,
+    complete INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+"""
+
+INSERT_SQL = "INSERT INTO progress (ts, app_id, draft_url, section, state) VALUES (?, ?, ?, ?, ?)"
+INDEX_SQL = "INSERT OR REPLACE INTO draft_index (app_id, draft_url, marker, seen_ts) VALUES (?, ?, ?, ?)"
+FORGET_SQL = "DELETE FROM draft_index WHERE app_id = ? AND draft_url = ?"
+DISCOVERY_SQL = "INSERT OR REPLACE INTO discovery_state (app_id, complete, ts) VALUES (?, ?, ?)"
+
+DRAFT_INDEX_MAX_AGE = 30 * 24 * 3600  # index entries not seen for this long are ignored
+
+write_queue = None
+writer_thread = None
+
+
+# function to open a connection with the journal settings
+def connect(path=JOURNAL_PATH):
+    # several processes may share the journal (see sharding.py), so wait for their locks
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# background loop that writes queued rows in small transactions
+def write_loop(path, rows):
+    conn = connect(path)
+    running = True
+    while running:
+        batch = [rows.get()]
+        # drain whatever else is waiting so bursts share one commit
+        while True:
+            try:
+                batch.append(rows.get_nowait())
+            except queue.Empty:
+                break
+
+        if None in batch:
+            running = False
+            batch = [row for row in batch if row is not None]
+
+        try:
+            # rows are (statement, parameters); keep one executemany per statement
+            statements = {}
+            for sql, params in batch:
+                statements.setdefault(sql, []).append(params)
+            for sql, params in statements.items():
+                conn.executemany(sql, params)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[Journal Error] {e}")
+
+    conn.close()
+
+
+# function to start the journal writer
+def open_journal(path=JOURNAL_PATH):
+    global write_queue, writer_thread
+
+    if writer_thread is not None:
+        return
+    # create the schema up front so readers never see a missing table
+    connect(path).close()
+    write_queue = queue.Queue()
+    writer_thread = threading.Thread(target=write_loop, args=(path, write_queue), daemon=True)
+    writer_thread.start()
+
+
+# function to flush pending rows and stop the writer
+def close_journal():
+    global write_queue, writer_thread
+
+    if writer_thread is None:
+        return
+    write_queue.put(None)
+    writer_thread.join()
+    write_queue = None
+    writer_thread = None
+
+
+# function to append one progress row without blocking
+def record(app_id, draft_url, state, section=None):
+    if write_queue is not None:
+        write_queue.put((INSERT_SQL, (time.time(), app_id, draft_url, section, state)))
+
+
+# function to remember the list marker of a draft without blocking
+def record_draft_seen(app_id, draft_url, marker):
+    if write_queue is not None:
+        write_queue.put((INDEX_SQL, (app_id, draft_url, marker, time.time())))
+
+
+# function to drop a url from the index once it turned out not to be a draft
+def forget_draft(app_id, draft_url):
+    if write_queue is not None:
+        write_queue.put((FORGET_SQL, (app_id, draft_url)))
+
+
+# function to record whether the latest discovery of an account walked the whole list
+def record_discovery(app_id, complete):
+    if write_queue is not None:
+        write_queue.put((DISCOVERY_SQL, (app_id, int(complete), time.time())))
+
+
+# function to read the known drafts of an account as {url: marker}; empty
+# unless the last discovery of the account finished
+def load_draft_index(app_id, path=JOURNAL_PATH, max_age=DRAFT_INDEX_MAX_AGE):
+    conn = connect(path)
+    try:
+        state = conn.execute("SELECT complete FROM discovery_state WHERE app_id = ?", (app_id,)).fetchone()
+        if not state or not state[0]:
+            return {}
+        rows = conn.execute(
+            "SELECT draft_url, marker FROM draft_index WHERE app_id = ? AND seen_ts >= ?",
+            (app_id, time.time() - max_age),
+        )
+        return dict(rows.fetchall())
+    finally:
+        conn.close()
+
+
+# function to read back what is already done for an account
+def load_progress(app_id, path=JOURNAL_PATH):
+    progress = {}
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT draft_url, section, state FROM progress WHERE app_id = ? ORDER BY id",
+            (app_id,),
+        )
+        for draft_url, section, state in rows:
+            entry = progress.setdefault(draft_url, {"state": None, "sections": set()})
+            if state == SECTION_DONE:
+                entry["sections"].add(section)
+            else:
+                entry["state"] = state
+    finally:
+        conn.close()
+    return progress
@@ -1,9 +1,15 @@
-import PySimpleGUI as sg
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+import os
 import time
 import threading
 
-DRAFT_LIMIT_PER_BATCH = 5  # Number of drafts to open at once
+import diagnostics
+from concurrency import AdaptiveLimiter
+from retry import SELECTOR_TIMEOUT, TRANSIENT_NETWORK, backoff_delay, classify_error
+from session_store import BASE_URL, DASHBOARD_URL, restore_session_sync, save_session_sync  # shared with new_app.py
+from tab_pool import MAX_USES_PER_TAB
+
+DRAFT_LIMIT_PER_BATCH = 5  # Number of drafts to open at once to start with
+MAX_DRAFTS_PER_BATCH = 10  # The batch size adapts up to this (see concurrency.py)
 
 # Shared dictionary to track status
 status_dict = {}
@@ -22,14 +28,16 @@ def accept_cookies(page, app_id):
         page.wait_for_selector("button:has-text('Accept All')", timeout=3000)
         page.get_by_role("button", name="Accept All").click()
         update_status(app_id, "Cookie banner accepted")
-        page.screenshot(path=f"cookie_{app_id}.png", full_page=True)
-    except PlaywrightTimeoutError:
-        update_status(app_id, "No cookie banner found")
     except Exception as e:
-        update_status(app_id, f"Cookie error: {str(e)}")
+        if classify_error(e) == SELECTOR_TIMEOUT:
+            update_status(app_id, "No cookie banner found")
+        else:
+            update_status(app_id, f"Cookie error: {str(e)}")
 
 # Function to prompt for new credentials
 def prompt_for_credentials(app_id):
+    import PySimpleGUI as sg
+
     layout = [
         [sg.Text(f"Login failed for {app_id}. Please re-enter credentials:")],
         [sg.Text("Email:"), sg.Input(key="-NEW_EMAIL-")],
@@ -51,7 +59,7 @@ def login(page, email, password, app_id):
     while attempt <= max_attempts:
         try:
             update_status(app_id, "Navigating to login page")
-            page.goto("https://apps.trac.jobs/")
+            page.goto(f"{BASE_URL}/")
             accept_cookies(page, app_id)
 
             update_status(app_id, "Waiting for login form")
@@ -65,23 +73,30 @@ def login(page, email, password, app_id):
             page.get_by_role("button", name="Sign in").click()
 
             update_status(app_id, "Verifying login")
-            page.wait_for_url("https://apps.trac.jobs/dashboard", timeout=10000)
+            page.wait_for_url(DASHBOARD_URL, timeout=10000)
             current_url = page.url
             page_title = page.title()
             update_status(app_id, f"Login successful (URL: {current_url}, Title: {page_title})")
 
-            # Check for error message using a specific selector (adjust based on website HTML)
-            error_message = page.query_selector(".error-message, .alert-danger")
-            if error_message and "invalid" in error_message.text_content().lower():
-                raise Exception(f"Login failed: {error_message.text_content()}")
-
             return True, current_email, current_password
         except Exception as e:
             update_status(app_id, f"Login error (attempt {attempt}/{max_attempts}): {str(e)}")
-            page.screenshot(path=f"login_error_{app_id}_attempt_{attempt}.png", full_page=True)
+            diagnostics.capture_sync(page, app_id, f"login_attempt_{attempt}", "login_error")
             if attempt == max_attempts:
                 update_status(app_id, "Max login attempts reached")
                 return False, current_email, current_password
+
+            # Only ask for new credentials when the portal actually rejected them;
+            # timeouts and network errors are retried with the same ones after a backoff
+            rejection = login_rejection(page)
+            if not rejection:
+                delay = backoff_delay(TRANSIENT_NETWORK, attempt)
+                update_status(app_id, f"Login did not complete ({classify_error(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            update_status(app_id, f"Portal rejected the credentials: {rejection}")
             update_status(app_id, f"Waiting for new credentials (attempt {attempt}/{max_attempts})")
             new_email, new_password = prompt_for_credentials(app_id)
             if not new_email or not new_password:
@@ -90,13 +105,43 @@ def login(page, email, password, app_id):
             current_email, current_password = new_email, new_password
             attempt += 1
 
+# Function to read the portal's login error message, if it rejected the credentials
+def login_rejection(page):
+    try:
+        message = page.query_selector(".error-message, .alert-danger, .validation-summary-errors")
+        return message.text_content().strip() if message else None
+    except Exception:
+        return None
+
+# Function to open a logged-in context, reusing the saved session when possible
+def open_authenticated_context(browser, email, password, app_id):
+    report = lambda message: update_status(app_id, message)
+    context = restore_session_sync(browser.new_context, email, report)
+    if context is not None:
+        return context, True, email, password
+
+    context = browser.new_context()
+    page = context.new_page()
+    login_result, email, password = login(page, email, password, app_id)
+    page.close()
+    if not login_result:
+        return context, False, email, password
+
+    # Store under the credentials that actually worked
+    save_session_sync(context, email, report)
+    return context, True, email, password
+
 # Function to navigate and get number of drafts applications 
 def navigate_and_get_drafts(page, app_id):
     try:
-        base_url = "https://apps.trac.jobs/applicationlist?Text=&Status%5B%5D=Draft&Submit=Search&_srt=lastupdateforcandidate&_sd=d&_pg="
+        base_url = f"{BASE_URL}/applicationlist?Text=&Status%5B%5D=Draft&Submit=Search&_srt=lastupdateforcandidate&_sd=d&_pg="
         draft_urls = []
         page_number = 1
 
+        # A restored session starts on a blank page
+        if not page.url.startswith(DASHBOARD_URL):
+            page.goto(DASHBOARD_URL)
+
         # Navigate to Applications and apply filter
         update_status(app_id, "Navigating to applications page")
         page.get_by_role("link", name="Applications", exact=True).click()
@@ -142,7 +187,7 @@ def navigate_and_get_drafts(page, app_id):
             for i in range(count):
                 href = links.nth(i).get_attribute("href")
                 if href:
-                    full_url = "https://apps.trac.jobs" + href if href.startswith("/") else href
+                    full_url = BASE_URL + href if href.startswith("/") else href
                     draft_urls.append(full_url)
 
             update_status(app_id, f"Collected {len(draft_urls)} drafts so far")
@@ -158,22 +203,35 @@ def navigate_and_get_drafts(page, app_id):
 
     except Exception as e:
         update_status(app_id, f"Error navigating or extracting drafts: {str(e)}")
-        page.screenshot(path=f"drafts_error_{app_id}.png", full_page=True)
+        diagnostics.capture_sync(page, app_id, "drafts", "drafts_error")
         return []
 
 # opening the different links to begin application 
 
 def apply_to_drafts_in_batches(context, draft_urls, app_id):
+    limiter = AdaptiveLimiter(
+        DRAFT_LIMIT_PER_BATCH, maximum=MAX_DRAFTS_PER_BATCH,
+        on_change=lambda old, new, reason: update_status(app_id, f"Batch size {old} -> {new}: {reason}"),
+    )
+    context.on("response", limiter.observe_response)
+    tabs = []  # [page, uses]; the tabs are kept open and reused by the next batch
     try:
-        for i in range(0, len(draft_urls), DRAFT_LIMIT_PER_BATCH):
-            batch = draft_urls[i:i + DRAFT_LIMIT_PER_BATCH]
-            pages = []
+        i = 0
+        while i < len(draft_urls):
+            batch = draft_urls[i:i + limiter.limit]
+            i += len(batch)
             update_status(app_id, f"Processing batch of {len(batch)} drafts")
             
-            # Open drafts concurrently in new tabs
-            for url in batch:
+            # Open drafts in the warm tabs, replacing worn-out or broken ones
+            for slot, url in enumerate(batch):
+                started = time.perf_counter()
+                if slot < len(tabs) and (tabs[slot][0].is_closed() or tabs[slot][1] >= MAX_USES_PER_TAB):
+                    close_tab(tabs.pop(slot)[0])
+                if slot >= len(tabs):
+                    tabs.insert(slot, [context.new_page(), 0])
+                page = tabs[slot][0]
+                tabs[slot][1] += 1
                 try:
-                    page = context.new_page()
                     update_status(app_id, f"Opening draft: {url}")
                     page.goto(url)
                     page.wait_for_timeout(3000)  # Wait 3 seconds
@@ -181,22 +239,34 @@ def apply_to_drafts_in_batches(context, draft_urls, app_id):
                     page.evaluate("window.scrollTo(0, document.body.scrollHeight)")  # Scroll to end
                     update_status(app_id, f"Filling details for {url}")
                     update_status(app_id, f"Applied to: {url}")
-                    pages.append(page)
+                    limiter.record(True, time.perf_counter() - started)
                 except Exception as e:
                     update_status(app_id, f"Error applying to {url}: {str(e)}")
-            
-            # Close all tabs in the batch
-            for page in pages:
-                update_status(app_id, f"Closing tab for {page.url}")
-                page.close()
-                time.sleep(0.5)  # Brief delay to ensure clean closure
+                    limiter.record(False)
+                    close_tab(page)  # a tab that failed is replaced in the next batch
 
     except Exception as e:
         update_status(app_id, f"Batch processing error: {str(e)}")
+    finally:
+        for page, _uses in tabs:
+            close_tab(page)
+
+
+# Function to close a tab without failing the batch
+def close_tab(page):
+    try:
+        if not page.is_closed():
+            page.close()
+    except Exception:
+        pass
 
 
 # Main function with UI
 def main():
+    # GUI and browser libraries are only loaded when the app actually starts
+    import PySimpleGUI as sg
+    from playwright.sync_api import sync_playwright
+
     layout = [
         [sg.Text("Email:"), sg.Input(key="-EMAIL-")],
         [sg.Text("Password:"), sg.Input(key="-PASSWORD-", password_char="*")],
@@ -220,16 +290,25 @@ def main():
                 app_id = "Application"
                 update_status(app_id, "Starting automation")
                 with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=False)
-                    context = browser.new_context()
-                    page = context.new_page()
+                    # Attach to the warm browser server when asked to and one is running (see browser_server.py)
+                    endpoint = None
+                    if os.environ.get("USE_BROWSER_SERVER") == "1":
+                        from browser_server import server_endpoint
+
+                        endpoint = server_endpoint()
+                    if endpoint:
+                        update_status(app_id, f"Using warm browser at {endpoint}")
+                        browser = p.chromium.connect_over_cdp(endpoint)
+                    else:
+                        browser = p.chromium.launch(headless=False)
 
                     try:
-                        # Perform login
-                        login_result, email, password = login(page, email, password, app_id)
+                        # Reuse the saved session or perform login
+                        context, login_result, email, password = open_authenticated_context(browser, email, password, app_id)
                         if not login_result:
                             update_status(app_id, "Automation aborted due to login failure")
                             break
+                        page = context.new_page()
 
                         # Get draft URLs
                         draft_urls = navigate_and_get_drafts(page, app_id)
@@ -0,0 +1,428 @@
+import argparse
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for the trac.jobs candidate portal.
+#
+#   python -m mock_portal --port 8765 --drafts 120 --latency-ms 40 --failure-rate 0.02
+#   TRAC_BASE_URL=http://127.0.0.1:8765 python -m cli run --accounts accounts.csv
+#
+# It serves only what the automation touches, with the same ids and labels:
+#   /                     cookie banner and sign-in form (any email/password works)
+#   /dashboard            landing page with the "Applications" link
+#   /applicationlist      draft search results, 10 per page, newest update first
+#   /application/<id>     draft form with the blk_6806_ApplicationForm sections,
+#                         "Save & next"/"Save" fieldsets, toasts and VacancyDetailsModal
+#
+# Pages also load a cacheable stylesheet, script, logo and web font from
+# /static, like the real portal's assets, so resource blocking and the browser
+# cache show up in benchmark results.
+#
+# Every response is delayed by --latency-ms (+/- --jitter-ms) and saves fail
+# with probability --failure-rate, so slow or flaky portals can be reproduced.
+
+config = {
+    "drafts": 60,
+    "vacancies": 15,
+    "latency_ms": 0,
+    "jitter_ms": 0,
+    "failure_rate": 0.0,
+}
+
+state_lock = threading.Lock()
+sessions = set()
+drafts = {}
+request_counts = {"total": 0, "saves": 0, "failed_saves": 0, "static": 0}
+
+# 1x1 transparent PNG; the font is padding of a realistic size, browsers just reject it
+LOGO_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000b49444154789c6360000200000500017a5eab3f0000"
+    "000049454e44ae426082"
+)
+STATIC_FILES = {
+    "/static/portal.css": ("text/css", (".portal-header { font-weight: bold; }\n" * 400).encode("utf-8")),
+    "/static/portal.js": ("application/javascript", ("window.portalReady = true;\n" * 800).encode("utf-8")),
+    "/static/logo.png": ("image/png", LOGO_PNG),
+    "/static/portal.woff2": ("font/woff2", bytes(30_000)),
+}
+STATIC_CACHE_SECONDS = 3600
+
+# sections of the draft form: (edit key, complete key or None, section container id, fieldset pages, last button)
+SECTIONS = [
+    ("persdetails", "PersDetails", "AppForm_Section_PersDetails", "personal", "save"),
+    ("references", "References", "AppForm_Section_References", "references", "submit"),
+    ("equalops", "EqualOps", "AppForm_Section_EqualOps", "equalops", "save"),
+    ("genedu", None, "AppForm_Section_GenEdu", "generic", "next"),
+    ("gentraining", None, "AppForm_Section_GenTraining", "generic", "next"),
+    ("profmembership", None, "AppForm_Section_ProfMembership", "generic", "next"),
+    ("nhsservice", None, "AppForm_Section_NhsService", "generic", "next"),
+    ("emphistory", None, "AppForm_Section_EmpHistory", "generic", "next"),
+    ("gaps", None, "AppForm_Section_Gaps", "generic", "next"),
+]
+
+CRB_SELECT = '<select name="crb{0}"><option value="">Please select</option><option value="Y">Yes</option><option value="N">No</option></select>'
+
+FIELDSET_PAGES = {
+    "personal": [
+        '<div id="EditAppFieldset_personal"><label><input type="checkbox" '
+        'id="EditAppFieldset.personal-preferredemployment_Fulltime"> Full time</label></div>',
+        '<div id="EditAppFieldset_contact"><input name="phone" value="0123456789"></div>',
+        '<div id="EditAppFieldset_crbquestions"><div class="fieldset-fields">'
+        + "".join(CRB_SELECT.format(i) for i in range(3)) + "</div></div>",
+    ],
+    "references": [
+        '<div id="EditAppFieldset_references"><p>Referees on file</p></div>',
+    ],
+    "equalops": [
+        '<div id="EditAppFieldset_equalops1"><p>About equal opportunities</p></div>',
+        '<div id="EditAppFieldset_equalops2"><p>Monitoring questions</p></div>',
+        '<div id="EditAppFieldset_sourcefs"><label for="EditAppFieldset_source">Please state where you first '
+        'heard about this vacancy</label><select id="EditAppFieldset_source" name="EditAppFieldset_source">'
+        '<option value="">Please select</option><option value="NHSJ">NHS Jobs</option>'
+        '<option value="HJUK">Health Jobs UK</option></select></div>',
+        '<div id="EditAppFieldset_declarationb"><input type="checkbox" id="EditAppFieldset_declarationb-iagree" '
+        'name="EditAppFieldset_declarationb-iagree"><label for="EditAppFieldset_declarationb-iagree">'
+        'I agree to the above</label></div>',
+    ],
+    "generic": [
+        '<div class="fieldset-fields"><p>Nothing to add</p></div>',
+        '<div class="fieldset-fields"><p>Review</p></div>',
+    ],
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+.modal {{ display: none; position: fixed; inset: 10%; background: #fff; border: 1px solid #888; }}
+.modal.show {{ display: block; }}
+#cookie-banner {{ position: fixed; bottom: 0; left: 0; right: 0; background: #eee; padding: 1em; }}
+@font-face {{ font-family: "Portal"; src: url("/static/portal.woff2") format("woff2"); }}
+.portal-header {{ font-family: "Portal", sans-serif; }}
+</style>
+<link rel="stylesheet" href="/static/portal.css"><script src="/static/portal.js"></script></head>
+<body><div class="portal-header"><img src="/static/logo.png" alt="trac.jobs"> Candidate portal</div>{body}</body></html>"""
+
+
+# function to reset the portal to a fresh set of drafts
+def reset_state(draft_count=None, vacancy_count=None):
+    if draft_count is not None:
+        config["drafts"] = draft_count
+    if vacancy_count is not None:
+        config["vacancies"] = vacancy_count
+
+    now = time.time()
+    with state_lock:
+        sessions.clear()
+        drafts.clear()
+        for draft_id in range(1, config["drafts"] + 1):
+            drafts[draft_id] = {
+                "vacancy": 1000 + draft_id % max(1, config["vacancies"]),
+                "updated": now - draft_id * 60,
+                "complete": set(),
+            }
+        request_counts.update({"total": 0, "saves": 0, "failed_saves": 0, "static": 0})
+
+
+# function to describe a vacancy; drafts for the same vacancy share the text
+def vacancy_text(vacancy_id):
+    return (
+        f"Vacancy {vacancy_id}: Staff Nurse, Band 5.\n"
+        "You will deliver high quality patient care as part of a friendly ward team, "
+        "working shifts across days, nights and weekends.\n"
+        "Essential: NMC registration, good communication skills, commitment to learning."
+    )
+
+
+def render_login():
+    body = """
+<div id="cookie-banner"><p>We use cookies.</p>
+<button type="button" onclick="document.getElementById('cookie-banner').remove()">Accept All</button></div>
+<h1>Candidate sign in</h1>
+<form method="post" action="/login">
+<label>Email <input name="FrmCoreLogin-CandidateSignIn_Email" type="email"></label>
+<label>Password <input name="FrmCoreLogin-CandidateSignIn_Password" type="password"></label>
+<button type="submit">Sign in</button>
+</form>"""
+    return PAGE_TEMPLATE.format(title="Sign in", body=body)
+
+
+def render_dashboard():
+    body = '<h1>Dashboard</h1><nav><a href="/applicationlist">Applications</a></nav>'
+    return PAGE_TEMPLATE.format(title="Dashboard", body=body)
+
+
+def render_application_list(page_number):
+    with state_lock:
+        ordered = sorted(drafts.items(), key=lambda item: item[1]["updated"], reverse=True)
+    chunk = ordered[(page_number - 1) * 10:page_number * 10]
+
+    articles = []
+    for draft_id, draft in chunk:
+        updated = time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(draft["updated"]))
+        articles.append(
+            f'<article><h3>Vacancy {draft["vacancy"]} - Staff Nurse</h3>'
+            f'<p class="status">Draft</p><p class="updated">Last updated {updated}</p>'
+            f'<a href="/application/{draft_id}">Complete your application</a></article>'
+        )
+
+    body = (
+        '<h1>Applications</h1><form><label><input type="checkbox" id="AppSearch.Status_Draft" checked> Draft</label></form>'
+        f'<div id="ApplicationListResults">{"".join(articles)}</div>'
+    )
+    return PAGE_TEMPLATE.format(title="Applications", body=body)
+
+
+def render_draft(draft_id, draft):
+    cards = []
+    for edit_key, complete_key, container_id, _pages, _last in SECTIONS:
+        done = complete_key in draft["complete"]
+        complete_button = ""
+        if complete_key and not done:
+            complete_button = (
+                f'<button type="button" id="blk_6806_ApplicationForm.Complete_Section_{complete_key}" '
+                f'onclick="completeSection(\'{complete_key}\')">Mark section as complete</button>'
+            )
+        cards.append(
+            f'<div class="card" id="{container_id}"><div class="card-body">'
+            f'<h2>{edit_key}</h2><span class="badge">{"Complete" if done else "Incomplete"}</span></div>'
+            f'<div class="card-footer"><button type="button" id="blk_6806_ApplicationForm.Edit_Fieldset_{edit_key}" '
+            f'onclick="openEditor(\'{edit_key}\')">Edit</button>{complete_button}</div></div>'
+        )
+
+    sections = {
+        edit_key: {"pages": FIELDSET_PAGES[pages], "last": last}
+        for edit_key, _complete, _container, pages, last in SECTIONS
+    }
+    description = html.escape(vacancy_text(draft["vacancy"])).replace("\n", "<br>")
+
+    body = f"""
+<h1>Application {draft_id}</h1>
+<button type="button" onclick="document.getElementById('VacancyDetailsModal').classList.add('show')">About this job</button>
+<div class="modal" id="VacancyDetailsModal" data-vacancy-id="{draft["vacancy"]}"><div class="modal-dialog"><div class="modal-content">
+<div class="modal-header"><h5>About this job</h5>
+<button type="button" aria-label="Dismiss" onclick="document.getElementById('VacancyDetailsModal').classList.remove('show')">x</button></div>
+<div class="modal-body"><div>{description}</div></div>
+</div></div></div>
+<div id="blk_6806_ApplicationForm">{"".join(cards)}</div>
+<div id="EditArea"></div>
+<div id="ToastArea"></div>
+<script>
+const SECTIONS = {json.dumps(sections)};
+const BASE = "/application/{draft_id}";
+let editor = null;
+
+function openEditor(key) {{ editor = {{key: key, page: 0}}; render(); }}
+
+function render() {{
+    const area = document.getElementById("EditArea");
+    if (!editor) {{ area.innerHTML = ""; return; }}
+    const section = SECTIONS[editor.key];
+    const last = editor.page === section.pages.length - 1;
+    let button = '<button type="button" onclick="saveNext()">Save &amp; next</button>';
+    if (last && section.last === "save") button = '<button type="button" onclick="saveFinal()">Save</button>';
+    if (last && section.last === "submit") button = '<button type="button" id="EditAppFieldset.Submit" onclick="saveFinal()">Submit</button>';
+    area.innerHTML = "<fieldset>" + section.pages[editor.page] + "</fieldset>" + button;
+}}
+
+async function post(path, payload) {{
+    const response = await fetch(BASE + path, {{
+        method: "POST", headers: {{"Content-Type": "application/json"}}, body: JSON.stringify(payload)
+    }});
+    if (!response.ok) showToast("Something went wrong, please try again");
+    return response.ok;
+}}
+
+async function saveNext() {{
+    if (!(await post("/save", {{section: editor.key, page: editor.page}}))) return;
+    editor.page += 1;
+    if (editor.page >= SECTIONS[editor.key].pages.length) editor = null;
+    render();
+}}
+
+async function saveFinal() {{
+    if (!(await post("/save", {{section: editor.key, page: editor.page}}))) return;
+    editor = null;
+    render();
+    showToast("Your changes have been saved");
+}}
+
+async function completeSection(key) {{
+    if (!(await post("/complete", {{section: key}}))) return;
+    document.getElementById("blk_6806_ApplicationForm.Complete_Section_" + key).remove();
+}}
+
+function showToast(message) {{
+    const toast = document.createElement("div");
+    toast.className = "toast show";
+    toast.innerHTML = '<span>' + message + '</span> <button type="button" data-bs-dismiss="toast" aria-label="Close">Close</button>';
+    toast.querySelector("button").onclick = () => toast.remove();
+    document.getElementById("ToastArea").appendChild(toast);
+}}
+</script>"""
+    return PAGE_TEMPLATE.format(title=f"Application {draft_id}", body=body)
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def delay(self):
+        with state_lock:
+            request_counts["total"] += 1
+        latency = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        token = cookie["portal_session"].value if "portal_session" in cookie else None
+        with state_lock:
+            return token if token in sessions else None
+
+    def send(self, status, body="", content_type="text/html; charset=utf-8", headers=None):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location, headers=None):
+        self.send(303, headers=dict(headers or {}, Location=location))
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def do_GET(self):
+        self.delay()
+        url = urlparse(self.path)
+
+        if url.path == "/":
+            return self.send(200, render_login())
+        if url.path == "/health":
+            with state_lock:
+                return self.send(200, json.dumps(request_counts), "application/json")
+        if url.path in STATIC_FILES:
+            with state_lock:
+                request_counts["static"] += 1
+            content_type, data = STATIC_FILES[url.path]
+            return self.send(200, data, content_type, {"Cache-Control": f"public, max-age={STATIC_CACHE_SECONDS}"})
+
+        if self.session() is None:
+            return self.redirect("/")
+
+        if url.path == "/dashboard":
+            return self.send(200, render_dashboard())
+        if url.path == "/applicationlist":
+            page_number = int(parse_qs(url.query).get("_pg", ["1"])[0] or 1)
+            return self.send(200, render_application_list(max(1, page_number)))
+        if url.path.startswith("/application/"):
+            draft = self.find_draft(url.path)
+            if draft is None:
+                return self.send(404, "Not found")
+            return self.send(200, render_draft(*draft))
+
+        self.send(404, "Not found")
+
+    def do_POST(self):
+        self.delay()
+        url = urlparse(self.path)
+
+        if url.path == "/login":
+            form = parse_qs(self.read_body())
+            email = form.get("FrmCoreLogin-CandidateSignIn_Email", [""])[0]
+            password = form.get("FrmCoreLogin-CandidateSignIn_Password", [""])[0]
+            if not email or not password:
+                return self.redirect("/")
+            token = secrets.token_hex(16)
+            with state_lock:
+                sessions.add(token)
+            return self.redirect("/dashboard", {"Set-Cookie": f"portal_session={token}; Path=/; HttpOnly"})
+
+        if self.session() is None:
+            return self.send(401, json.dumps({"error": "session expired"}), "application/json")
+
+        draft = self.find_draft(url.path.rsplit("/", 1)[0])
+        if draft is None:
+            return self.send(404, "Not found")
+        draft_id, record = draft
+        payload = json.loads(self.read_body() or "{}")
+
+        if url.path.endswith("/save"):
+            with state_lock:
+                request_counts["saves"] += 1
+                failed = random.random() < config["failure_rate"]
+                if failed:
+                    request_counts["failed_saves"] += 1
+                else:
+                    record["updated"] = time.time()
+            if failed:
+                return self.send(500, json.dumps({"error": "injected failure"}), "application/json")
+            return self.send(200, json.dumps({"ok": True}), "application/json")
+
+        if url.path.endswith("/complete"):
+            with state_lock:
+                record["complete"].add(payload.get("section"))
+                record["updated"] = time.time()
+            return self.send(200, json.dumps({"ok": True}), "application/json")
+
+        self.send(404, "Not found")
+
+    def find_draft(self, path):
+        try:
+            draft_id = int(path.rstrip("/").rsplit("/", 1)[1])
+        except (IndexError, ValueError):
+            return None
+        with state_lock:
+            record = drafts.get(draft_id)
+        return (draft_id, record) if record is not None else None
+
+
+# function to start the portal on a background thread, returns the server and its base url
+def start_server(host="127.0.0.1", port=0, **options):
+    config.update({key: value for key, value in options.items() if value is not None})
+    reset_state()
+    server = ThreadingHTTPServer((host, port), PortalHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mock_portal", description="Local stand-in for the trac.jobs portal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--drafts", type=int, default=config["drafts"])
+    parser.add_argument("--vacancies", type=int, default=config["vacancies"])
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"], help="delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"], help="random +/- variation of the delay")
+    parser.add_argument("--failure-rate", type=float, default=config["failure_rate"], help="probability that a save fails with HTTP 500")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_server(
+        args.host, args.port,
+        drafts=args.drafts, vacancies=args.vacancies, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, failure_rate=args.failure_rate,
+    )
+    print(f"Mock portal serving {args.drafts} drafts on {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,59 @@
-import PySimpleGUI as sg
 import asyncio
+import contextlib
+import csv
+import functools
+import hashlib
+import os
 import threading
 import time
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import diagnostics
+from concurrency import AdaptiveLimiter
+import generation
+import journal
+from jd_cache import get_job_description, store_job_description
+from readiness import wait_for_draft_ready
+from resource_blocking import enable_resource_blocking, format_stats, reset_stats
+from retry import SELECTOR_TIMEOUT, ValidationFailed, call_with_retry, classify_error
+from sections import read_section_status, run_section
+from session_store import BASE_URL, DASHBOARD_URL, restore_session, save_session, session_is_valid
+from tab_pool import TabPool
+from status_bus import events_since, format_event, jsonl_sink, publish, sinks
+from timing import export_chrome_trace, format_summary, reset_spans, span
+
+status_dict = {}  # latest message per app_id; the full history lives in status_bus
+remaining_drafts = 0
+resume_text = ""
 
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+DEFAULT_CONCURRENCY = 5  # starting tab limit, shared by all accounts
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "12"))  # the adaptive limit never goes above this
 
-status_dict = {}
-remaining_drafts = 0
-lock = threading.Lock()
+DRAFT_LIST_URL = f"{BASE_URL}/applicationlist?Text=&Status%5B%5D=Draft&Submit=Search&_srt=lastupdateforcandidate&_sd=d&_pg="
+DRAFT_LINK_TEXT = "Complete your application"
+DRAFTS_PER_PAGE = 10
+DISCOVERY_MODE = "http"  # "http" fetches list pages directly, "browser" clicks through them
+DISCOVERY_PAGE_CONCURRENCY = 4
+DISCOVERY_QUEUE_SIZE = 2 * DRAFTS_PER_PAGE  # discovery pauses while this many drafts wait for a tab
+INCREMENTAL_DISCOVERY = True  # stop paging at the first draft unchanged since the last run
+INDEX_REQUEUE_LIMIT = 5 * DRAFTS_PER_PAGE  # known drafts queued from the index per run when paging stops early
+
+BLOCK_RESOURCES = True  # abort image, font, media and analytics requests (see resource_blocking.py)
+
+# sections filled on every draft, in order ("personal" and "references" are switched off for now)
+DRAFT_SECTIONS = ["equalops"]
 
-DRAFT_LIMIT_PER_BATCH = 5
+STATUS_LOG_PATH = os.environ.get("STATUS_LOG_PATH")  # optional JSONL copy of every status event
+TRACE_PATH = os.environ.get("TRACE_PATH")  # optional Chrome-trace JSON of the timing spans
+RESUME_PATH = os.environ.get("RESUME_PATH")  # when set, a supporting document is generated per draft
+GUI_MAX_STATUS_LINES = 2000
+USE_BROWSER_SERVER = os.environ.get("USE_BROWSER_SERVER") == "1"  # opt in: its debugging port is unauthenticated (see browser_server.py)
 
-def update_status(app_id, status):
-    with lock:
-        status_dict[app_id] = status
+def update_status(app_id, status, url=None, section=None, level=None):
+    status_dict[app_id] = status
+    publish(app_id, status, url=url, section=section, level=level)
 
 # function to handle cookies 
 async def accept_cookies(page, app_id):
@@ -22,16 +62,17 @@ async def accept_cookies(page, app_id):
         await page.wait_for_selector("button:has-text('Accept All')", timeout=3000)
         await page.get_by_role("button", name="Accept All").click()
         update_status(app_id, "Cookie banner accepted")
-    except PlaywrightTimeoutError:
-        update_status(app_id, "No cookie banner found")
     except Exception as e:
-        update_status(app_id, f"Cookie error: {str(e)}")
+        if classify_error(e) == SELECTOR_TIMEOUT:
+            update_status(app_id, "No cookie banner found")
+        else:
+            update_status(app_id, f"Cookie error: {str(e)}")
 
 # function to handle login
 async def login(page, email, password, app_id):
     try:
         update_status(app_id, "Navigating to login page")
-        await page.goto("https://apps.trac.jobs/")
+        await page.goto(f"{BASE_URL}/")
         await accept_cookies(page, app_id)
 
         update_status(app_id, "Filling in login form")
@@ -41,320 +82,746 @@ async def login(page, email, password, app_id):
         await page.get_by_role("button", name="Sign in").click()
 
         update_status(app_id, "Waiting for dashboard")
-        await page.wait_for_url("https://apps.trac.jobs/dashboard", timeout=10000)
+        await page.wait_for_url(DASHBOARD_URL, timeout=10000)
 
         return True
     except Exception as e:
         update_status(app_id, f"Login error: {str(e)}")
+        await diagnostics.capture(page, app_id, "login", "login_error")
         return False
 
-# function to run automation
-async def run_automation(email, password):
-    app_id = "Application"
+# function to create a context with the resource blocking rules applied
+async def new_browser_context(browser, **options):
+    context = await browser.new_context(**options)
+    if BLOCK_RESOURCES:
+        await enable_resource_blocking(context)
+    return context
+
+# function to open a logged-in context, reusing the saved session when possible
+async def open_authenticated_context(browser, email, password, app_id):
+    report = functools.partial(update_status, app_id)
+    context = await restore_session(functools.partial(new_browser_context, browser), email, report, app_id)
+    if context is not None:
+        return context
+
+    context = await new_browser_context(browser)
+    if not await login_in_context(context, email, password, app_id):
+        await context.close()
+        return None
+    return context
+
+# function to log in on a fresh page of a context and save the session
+async def login_in_context(context, email, password, app_id):
+    page = await context.new_page()
+    try:
+        with span("login", account=app_id) as login_span:
+            login_span["ok"] = await login(page, email, password, app_id)
+    finally:
+        await page.close()
+    if not login_span["ok"]:
+        return False
+
+    await save_session(context, email, functools.partial(update_status, app_id))
+    return True
+
+# function to log a running context back in; tabs that lose the session together share one login
+async def reauthenticate(context, email, password, app_id, lock):
+    async with lock:
+        if await session_is_valid(context, functools.partial(update_status, app_id), app_id):
+            return True
+        update_status(app_id, "Session lost, logging in again")
+        return await login_in_context(context, email, password, app_id)
+
+# function to read "email,password" lines from an accounts file
+def load_accounts(path):
+    accounts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Expected 'email,password' in {path}, got: {row[0]}")
+            accounts.append((row[0].strip(), row[1].strip()))
+    return accounts
+
+# function to run one account in its own context of the shared browser
+async def process_account(browser, email, password, limiter, part=0, parts=1, open_tabs=None):
+    app_id = email
     update_status(app_id, "Starting automation")
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            context = await browser.new_context()
-            page = await context.new_page()
+        context = await open_authenticated_context(browser, email, password, app_id)
+        if context is None:
+            update_status(app_id, "Login failed. Aborting.")
+            return
+        # throttling and server errors anywhere in the context lower the tab limit
+        context.on("response", limiter.observe_response)
+        reauth = functools.partial(reauthenticate, context, email, password, app_id, asyncio.Lock())
 
-            login_success = await login(page, email, password, app_id)
-            if not login_success:
-                update_status(app_id, "Login failed. Aborting.")
+        try:
+            progress = await asyncio.to_thread(journal.load_progress, app_id)
+
+            # discovery feeds the workers page by page, so filling starts after the first list page
+            queue = asyncio.Queue(maxsize=DISCOVERY_QUEUE_SIZE)
+            worker_count = limiter.maximum
+            producer = asyncio.create_task(
+                feed_drafts(context, app_id, progress, queue, worker_count, part, parts), name=f"{app_id} discovery"
+            )
+            try:
+                await apply_to_drafts(context, queue, app_id, limiter, worker_count, progress, reauth, open_tabs)
+            finally:
+                await stop_feeding(producer, queue)
+            if producer.cancelled():
+                update_status(app_id, "Tab workers stopped before discovery finished")
                 return
+            queued, finished = producer.result()
 
-            draft_urls = await navigate_and_get_drafts(page, app_id)
-            if not draft_urls:
+            if finished:
+                update_status(app_id, f"Skipped {finished} drafts finished in an earlier run")
+            if not queued and not finished:
                 update_status(app_id, "No drafts found. Exiting.")
                 return
-
-            await apply_to_drafts_in_batches(context, draft_urls, app_id)
-
-            await context.close()
-            await browser.close()
             update_status(app_id, "Automation completed")
+        finally:
+            await context.close()
 
     except Exception as e:
         update_status(app_id, f"[Automation Error] {str(e)}")
 
-# function to handle closing toast popup
-async def close_toast(page, app_id):
-    try:
-        await page.wait_for_selector("button[data-bs-dismiss='toast']", timeout=3000)
-        await page.get_by_role("button", name="Close", exact=True).click()
-        update_status(app_id, "Toast closed")
-    except:
-        pass
+# function to attach to the warm browser server when one is running, else launch a browser;
+# closing a browser attached this way only disconnects and drops the run's contexts
+async def open_browser(p, headless=False):
+    endpoint = None
+    if USE_BROWSER_SERVER:
+        from browser_server import server_endpoint  # only runs that use the server load it
 
-# function to handle draft applications 
-async def handle_draft_application(page, url, app_id):
+        endpoint = await asyncio.to_thread(server_endpoint)
+    if endpoint:
+        try:
+            with span("browser_connect"):
+                browser = await p.chromium.connect_over_cdp(endpoint)
+            update_status("Automation", f"Using warm browser at {endpoint}")
+            return browser
+        except Exception as e:
+            update_status("Automation", f"Browser server unavailable ({str(e)}), launching a browser")
+    with span("browser_launch"):
+        return await p.chromium.launch(headless=headless)
+
+# function to run automation for every account inside one browser
+async def run_automation(accounts, concurrency=DEFAULT_CONCURRENCY, headless=False, max_concurrency=None):
+    global remaining_drafts, resume_text
+
+    remaining_drafts = 0
+    resume_text = ""
+    if RESUME_PATH:
+        with open(RESUME_PATH, encoding="utf-8") as f:
+            resume_text = f.read()
+    reset_stats()
+    reset_spans()
     try:
-        update_status(app_id, f"Opening: {url}")
-        await page.goto(url)
-        await page.wait_for_timeout(2000)
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        # Playwright is imported on first use so the CLI, tests and tools start fast
+        from playwright.async_api import async_playwright
 
-        # Section functions
-        await extract_job_description(page, app_id)
+        journal.open_journal()
+        async with async_playwright() as p:
+            browser = await open_browser(p, headless)
+            limiter = AdaptiveLimiter(
+                concurrency, minimum=1, maximum=max(concurrency, max_concurrency or MAX_CONCURRENCY),
+                on_change=lambda old, new, reason: update_status("Concurrency", f"Tab limit {old} -> {new}: {reason}"),
+            )
+            update_status("Concurrency", f"Tab limit {limiter.limit} (adapts between {limiter.minimum} and {limiter.maximum})")
+            # the tab pools of all accounts keep their idle tabs within the one tab limit
+            open_tabs = {"count": 0}
+            # an account may carry (part, parts) when several processes share it
+            await asyncio.gather(*(
+                process_account(browser, email, password, limiter, *shard, open_tabs=open_tabs)
+                for email, password, *shard in accounts
+            ))
+            await browser.close()
 
-        # await fill_personal_details(page, app_id)
-        # await fill_references(page, app_id)
-        await fill_equal_opportunities(page, app_id)
+        if BLOCK_RESOURCES:
+            update_status("Automation", format_stats())
+
+        update_status("Timing", "Latency summary\n" + format_summary())
+        if TRACE_PATH:
+            export_chrome_trace(TRACE_PATH)
+            update_status("Timing", f"Chrome trace written to {TRACE_PATH}")
 
-        update_status(app_id, f"✅ Done: {url}")
     except Exception as e:
-        update_status(app_id, f"[Draft Error] {url}: {str(e)}")
+        update_status("Automation", f"[Automation Error] {str(e)}")
     finally:
-        await page.close()
+        await diagnostics.flush()
+        await asyncio.to_thread(journal.close_journal)
+
+# function to log every account in once and save its session, so several
+# processes sharing an account restore it instead of logging in at the same time
+async def prepare_sessions(accounts, headless=True):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await open_browser(p, headless)
+        for email, password in accounts:
+            context = await open_authenticated_context(browser, email, password, email)
+            if context is not None:
+                await context.close()
+        await browser.close()
+
+# function to pick the sections still to fill; the page decides, and the journal
+# only speaks for sections whose state the page does not show
+def pending_sections(section_status, done_sections=()):
+    pending = []
+    for name in DRAFT_SECTIONS:
+        complete = section_status.get(name)
+        if complete is None:
+            complete = name in done_sections
+        if not complete:
+            pending.append(name)
+    return pending
+
+# raised when a queued url no longer opens a draft; never retried
+class NotADraft(ValidationFailed):
+    pass
 
-# function that handle batches of draft
-async def apply_to_drafts_in_batches(context, draft_urls, app_id):
-    global remaining_drafts
+# function to handle draft applications 
+async def handle_draft_application(page, url, app_id, done_sections=(), reauth=None):
+    async def open_draft():
+        response = await page.goto(url, wait_until="domcontentloaded")
+        if response is not None and response.status in (404, 410):
+            raise NotADraft(f"HTTP {response.status}")
+        # a submitted or withdrawn application moves elsewhere; the sign-in page means the session is gone
+        if "/login" not in page.url and urlsplit(page.url).path.rstrip("/") != urlsplit(url).path.rstrip("/"):
+            raise NotADraft(f"Redirected to {page.url}")
+        await wait_for_draft_ready(page)
+
+    def report_retry(kind, attempt, error):
+        update_status(app_id, f"Retrying {url} ({kind}, retry {attempt}): {str(error)}", url=url)
 
     try:
-        for i in range(0, len(draft_urls), DRAFT_LIMIT_PER_BATCH):
-            batch = draft_urls[i:i + DRAFT_LIMIT_PER_BATCH]
-            update_status(app_id, f"Processing batch of {len(batch)} drafts")
-
-            tasks = []
-
-            for url in batch:
-                page = await context.new_page()
-                task = asyncio.create_task(handle_draft_application(page, url, app_id))
-                tasks.append(task)
-
-            await asyncio.gather(*tasks)
+        journal.record(app_id, url, journal.STARTED)
+        update_status(app_id, f"Opening: {url}", url=url)
+        with span("goto", url=url):
+            await call_with_retry(open_draft, page, reauth, report_retry)
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 
-            remaining_drafts -= len(batch)
-            update_status(app_id, f"{remaining_drafts} drafts remaining")
+        # one DOM query tells us which sections still need work
+        section_status = await read_section_status(page, DRAFT_SECTIONS)
+        pending = pending_sections(section_status, done_sections)
+        if not pending:
+            journal.record(app_id, url, journal.DRAFT_DONE)
+            update_status(app_id, f"✅ Already complete: {url}", url=url)
+            return True
 
+        # Section functions
+        with span("job_description", url=url):
+            job_description = await extract_job_description(page, app_id)
+
+        # the supporting document is generated while the other sections are filled
+        document_task = None
+        if resume_text and job_description:
+            document_task = asyncio.create_task(prepare_supporting_document(job_description, app_id, url))
+
+        all_filled = True
+        for name in pending:
+            if await fill_section(page, name, app_id, url, reauth):
+                journal.record(app_id, url, journal.SECTION_DONE, name)
+            else:
+                all_filled = False
+
+        if document_task is not None:
+            await document_task
+
+        if not all_filled:
+            journal.record(app_id, url, journal.DRAFT_FAILED)
+            update_status(app_id, f"[Draft Incomplete] {url}", url=url)
+            await diagnostics.capture(page, app_id, url, "draft_incomplete")
+            return False
+
+        journal.record(app_id, url, journal.DRAFT_DONE)
+        update_status(app_id, f"✅ Done: {url}", url=url)
+        return True
+    except NotADraft as e:
+        journal.forget_draft(app_id, url)
+        update_status(app_id, f"[Not a Draft] {url}: {str(e)}, removed from the index", url=url)
+        return None  # says nothing about the portal's health, so the tab limit ignores it
     except Exception as e:
-        update_status(app_id, f"[Batch Error] {str(e)}")
+        journal.record(app_id, url, journal.DRAFT_FAILED)
+        update_status(app_id, f"[Draft Error] {url}: {str(e)}", url=url)
+        await diagnostics.capture(page, app_id, url, "draft_error")
+        return False
 
-# function to handle navigation
-async def navigate_and_get_drafts(page, app_id):
+# function to generate the supporting document for a draft in the background
+async def prepare_supporting_document(job_description, app_id, url):
     try:
-        base_url = "https://apps.trac.jobs/applicationlist?Text=&Status%5B%5D=Draft&Submit=Search&_srt=lastupdateforcandidate&_sd=d&_pg="
-        draft_urls = []
-        page_number = 1
-
-        update_status(app_id, "Navigating to Applications")
-        await page.get_by_role("link", name="Applications", exact=True).click()
-
-        await page.wait_for_selector("#AppSearch\\.Status_Draft", timeout=5000)
-        await page.locator("#AppSearch\\.Status_Draft").click()
-        await page.wait_for_timeout(2000)
+        with span("supporting_document", url=url):
+            document = await generation.generate_supporting_document(resume_text, job_description)
+        update_status(app_id, f"[Supporting Doc] Ready ({len(document)} characters)", url=url, section="supporting_document")
+        return document
+    except Exception as e:
+        update_status(app_id, f"[Supporting Doc Error] {str(e)}", url=url, section="supporting_document")
+        return None
+
+# function that runs a fixed pool of tab workers over the draft queue
+async def apply_to_drafts(context, queue, app_id, limiter, worker_count, progress=None, reauth=None, open_tabs=None):
+    progress = progress or {}
+    account_processed = 0
+    pool = TabPool(context, open_tabs=open_tabs)
+
+    # each worker takes the next draft, then a slot from the shared limiter;
+    # None from the queue means discovery is finished
+    async def worker(worker_id):
+        global remaining_drafts
+        nonlocal account_processed
 
         while True:
-            paginated_url = f"{base_url}{page_number}"
-            await page.goto(paginated_url)
-            await page.wait_for_timeout(2000)
+            url = await queue.get()
+            if url is None:
+                return
+            await limiter.acquire()
 
+            ok = False
+            page = None
+            started = time.perf_counter()
             try:
-                await page.wait_for_selector("#ApplicationListResults article a", timeout=5000)
-                links = page.locator("#ApplicationListResults article a", has_text="Complete your application")
-                count = await links.count()
-                if count == 0:
-                    break
-
-                for i in range(count):
-                    href = await links.nth(i).get_attribute("href")
-                    if href:
-                        full_url = "https://apps.trac.jobs" + href if href.startswith("/") else href
-                        draft_urls.append(full_url)
-
-                update_status(app_id, f"Page {page_number}: Collected {count}, Total: {len(draft_urls)}")
-
-                if count < 10:
-                    break  # last page
-                page_number += 1
-
+                with span("tab_open"):
+                    page = await pool.acquire()
+                done_sections = progress.get(url, {}).get("sections", set())
+                with span("draft", url=url) as draft_span:
+                    ok = await handle_draft_application(page, url, app_id, done_sections, reauth)
+                    draft_span["ok"] = ok is not False
             except Exception as e:
-                update_status(app_id, f"Error on page {page_number}: {str(e)}")
-                break
+                update_status(app_id, f"[Worker {worker_id} Error] {url}: {str(e)}")
+            finally:
+                if page is not None:
+                    # a tab that just failed a draft is replaced rather than reused
+                    with span("tab_release"):
+                        await pool.release(page, reusable=ok is not False)
+                        await pool.trim(limiter.limit)
+                await limiter.release(ok, time.perf_counter() - started)
+                remaining_drafts -= 1
+                account_processed += 1
+                update_status(app_id, f"{account_processed} drafts processed, {queue.qsize()} queued")
 
-        global remaining_drafts
-        remaining_drafts = len(draft_urls)
-        return draft_urls
+    try:
+        # up to the limiter's maximum workers; the limiter decides how many run at once
+        update_status(app_id, f"Starting {worker_count} tab workers")
+        with span("tab_warm"):
+            await pool.warm(limiter.limit, limit=limiter.limit)
+        # named tasks give each tab its own track in the timing trace
+        await asyncio.gather(*(
+            asyncio.create_task(worker(i + 1), name=f"{app_id} tab {i + 1}")
+            for i in range(worker_count)
+        ))
 
     except Exception as e:
-        update_status(app_id, f"[Draft Collection Error] {str(e)}")
-        return []
+        update_status(app_id, f"[Worker Pool Error] {str(e)}")
+    finally:
+        update_status(app_id, f"Tab pool: {pool.created} tabs opened, {pool.recycled} recycled")
+        await pool.close()
 
-# function to extract job description
-async def extract_job_description(page, app_id):
-    try:
-        update_status(app_id, "[Job Desc] Opening modal")
-        await page.get_by_role("button", name="About this job").click()
-        await page.wait_for_selector("#VacancyDetailsModal .modal-body", timeout=5000)
+# function to handle navigation; errors are raised so an interrupted walk is not taken as complete
+async def iter_drafts_via_browser(page, app_id):
+    base_url = DRAFT_LIST_URL
+    total = 0
+    page_number = 1
 
-        jd_element = page.locator("#VacancyDetailsModal > div > div > div.modal-body > div")
-        job_description = await jd_element.inner_text()
+    if not page.url.startswith(DASHBOARD_URL):
+        await page.goto(DASHBOARD_URL)
 
-        update_status(app_id, "[Job Desc] Extracted successfully")
-        await page.locator("#VacancyDetailsModal > div > div > div.modal-header > button").click()
+    update_status(app_id, "Navigating to Applications")
+    await page.get_by_role("link", name="Applications", exact=True).click()
 
-        return job_description
+    await page.wait_for_selector("#AppSearch\\.Status_Draft", timeout=5000)
+    await page.locator("#AppSearch\\.Status_Draft").click()
+    await page.wait_for_load_state("domcontentloaded")
 
-    except Exception as e:
-        update_status(app_id, f"[Job Desc Error] {str(e)}")
-        return ""
+    while True:
+        paginated_url = f"{base_url}{page_number}"
 
-# function to fill personal information
-async def fill_personal_details(page, app_id):
-    try:
-        update_status(app_id, "[Personal] Starting section")
-        step_marker = "start"
+        try:
+            with span("discovery_page", page=page_number, mode="browser"):
+                await page.goto(paginated_url, wait_until="domcontentloaded")
+                # the results container is there even when the page past the last one is empty
+                await page.wait_for_selector("#ApplicationListResults", state="attached", timeout=5000)
+                # one round-trip for the whole list, parsed like the HTTP path
+                page_drafts = parse_draft_links(await page.content())
+                count = len(page_drafts)
+        except Exception as e:
+            raise Exception(f"Error on page {page_number}: {str(e)}") from e
+
+        if count == 0:
+            return
+        total += count
+        update_status(app_id, f"Page {page_number}: Collected {count}, Total: {total}")
+        yield page_drafts
+
+        if count < DRAFTS_PER_PAGE:
+            return  # last page
+        page_number += 1
+
+# parser that collects draft links from "#ApplicationListResults article a"
+class DraftLinkParser(HTMLParser):
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []  # (tag, inside results, inside article)
+        self.current_href = None
+        self.current_text = []
+        self.article_text = None  # all text of the current article, for its marker
+        self.article_links = []
+        self.links = []  # (href, marker)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        in_results, in_article = self.stack[-1][1:] if self.stack else (False, False)
+        in_results = in_results or attrs.get("id") == "ApplicationListResults"
+        if in_results and tag == "article" and not in_article:
+            self.article_text = []
+            self.article_links = []
+        in_article = in_article or (in_results and tag == "article")
+
+        if tag == "a" and in_article:
+            self.current_href = attrs.get("href")
+            self.current_text = []
+
+        if tag not in self.VOID_TAGS:
+            self.stack.append((tag, in_results, in_article))
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.current_href is not None:
+            if DRAFT_LINK_TEXT in " ".join("".join(self.current_text).split()):
+                self.article_links.append(self.current_href)
+            self.current_href = None
+
+        # pop back to the matching open tag, tolerating unclosed children
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                closes_entry = tag == "article" and not (i and self.stack[i - 1][2])  # not an article nested in one
+                del self.stack[i:]
+                break
+        else:
+            return
+
+        # the marker changes whenever the list entry does (it shows the last update)
+        if closes_entry and self.article_text is not None:
+            text = " ".join("".join(self.article_text).split())
+            marker = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            self.links.extend((href, marker) for href in self.article_links)
+            self.article_text = None
+
+    def handle_data(self, data):
+        if self.current_href is not None:
+            self.current_text.append(data)
+        if self.article_text is not None:
+            self.article_text.append(data)
+
+# function to pull (draft url, marker) pairs out of one application list page
+def parse_draft_links(html):
+    parser = DraftLinkParser()
+    parser.feed(html)
+    parser.close()
+    return [(BASE_URL + href if href.startswith("/") else href, marker) for href, marker in parser.links]
+
+# function to fetch one application list page with the session cookies
+async def fetch_draft_list_page(context, page_number):
+    with span("discovery_page", page=page_number):
+        response = await context.request.get(f"{DRAFT_LIST_URL}{page_number}", timeout=15000)
+    if not response.ok:
+        raise Exception(f"HTTP {response.status} for page {page_number}")
+    # an expired session is redirected to the sign-in page, which would read as an empty list
+    if not response.url.startswith(f"{BASE_URL}/applicationlist"):
+        raise Exception(f"Redirected to {response.url} for page {page_number}")
+    return parse_draft_links(await response.text())
+
+# function to yield the drafts of each list page over HTTP, in page order, with a
+# few pages in flight; no new page is requested while the caller is not asking for more.
+# With ramp_up the window starts at one page and doubles, for callers likely to stop early.
+async def iter_drafts_via_http(context, app_id, ramp_up=False):
+    update_status(app_id, "Fetching draft list pages over HTTP")
+    in_flight = deque()
+    next_page = 1
+    total = 0
+    window = 1 if ramp_up else DISCOVERY_PAGE_CONCURRENCY
 
-        for attempt in range(2):
-            try:
-                if step_marker == "start":
-                    await page.locator("#blk_6806_ApplicationForm\\.Edit_Fieldset_persdetails").click()
-                    step_marker = "checkbox"
-
-                if step_marker == "checkbox":
-                    checkbox = page.locator("#EditAppFieldset\\.personal-preferredemployment_Fulltime")
-                    await page.wait_for_selector("#EditAppFieldset\\.personal-preferredemployment_Fulltime", timeout=5000)
-                    if await checkbox.is_visible() and not await checkbox.is_checked():
-                        await checkbox.check()
-                    step_marker = "save_and_next"
-
-                if step_marker == "save_and_next":
-                    await page.get_by_role("button", name="Save & next").wait_for(timeout=10000)
-                    await page.get_by_role("button", name="Save & next").click()
-                    await page.get_by_role("button", name="Save & next").click()
-                    step_marker = "dropdowns"
-
-                if step_marker == "dropdowns":
-                    await page.wait_for_selector("#EditAppFieldset_crbquestions > div.fieldset-fields select")
-                    dropdowns = page.locator("#EditAppFieldset_crbquestions > div.fieldset-fields select")
-                    count = await dropdowns.count()
-                    for i in range(count):
-                        options = await dropdowns.nth(i).evaluate("el => Array.from(el.options).map(o => o.value)")
-                        if "N" in options:
-                            await dropdowns.nth(i).select_option("N")
-                    step_marker = "final_save"
-
-                if step_marker == "final_save":
-                    await page.get_by_role("button", name="Save").click()
-                    await close_toast(page, app_id)
-                    await page.locator("#blk_6806_ApplicationForm\\.Complete_Section_PersDetails").click()
-                    update_status(app_id, "[Personal] Section completed")
-                    break
+    try:
+        while True:
+            while len(in_flight) < window:
+                in_flight.append((next_page, asyncio.ensure_future(fetch_draft_list_page(context, next_page))))
+                next_page += 1
+
+            number, task = in_flight.popleft()
+            links = await task
+            window = min(window * 2, DISCOVERY_PAGE_CONCURRENCY)
+            total += len(links)
+            update_status(app_id, f"Page {number}: Collected {len(links)}, Total: {total}")
+            if links:
+                yield links
+            if len(links) < DRAFTS_PER_PAGE:
+                return  # later pages in flight are empty
+    finally:
+        for _number, task in in_flight:
+            task.cancel()
+        await asyncio.gather(*(task for _number, task in in_flight), return_exceptions=True)
 
-            except Exception as e:
-                update_status(app_id, f"[Personal] Retry {attempt+1}/2: {str(e)}")
-                await page.reload()
-                await page.wait_for_timeout(2000)
-                continue
+# function to yield (url, marker) pairs page by page, over HTTP with the browser as fallback
+async def discover_drafts(context, app_id, ramp_up=False):
+    if DISCOVERY_MODE == "http":
+        try:
+            # aclosing cancels the pages still in flight when the caller stops early
+            async with contextlib.aclosing(iter_drafts_via_http(context, app_id, ramp_up)) as pages:
+                async for links in pages:
+                    yield links
+            return
+        except Exception as e:
+            update_status(app_id, f"[HTTP Discovery Error] {str(e)}, falling back to browser")
 
-    except Exception as e:
-        update_status(app_id, f"[Personal] Failed: {str(e)}")
+    page = await context.new_page()
+    try:
+        async with contextlib.aclosing(iter_drafts_via_browser(page, app_id)) as pages:
+            async for links in pages:
+                yield links
+    finally:
+        await page.close()
 
-# function to fill references 
-async def fill_references(page, app_id):
-    step_marker = "start"
-    update_status(app_id, "[References] Starting")
+# function to assign a draft to one of several processes sharing an account (see sharding.py)
+def draft_shard(url, parts):
+    if parts <= 1:
+        return 0
+    return int(hashlib.sha1(url.encode("utf-8")).hexdigest()[:8], 16) % parts
+
+# function to queue discovered drafts for the workers, skipping ones finished in an
+# earlier run; returns (queued, finished).
+# The list is sorted by last update, newest first, so with INCREMENTAL_DISCOVERY
+# paging stops at the first draft whose list entry is unchanged since it was last
+# seen: everything below it is older. Known drafts below that point that were never
+# finished are queued from the index instead of being fetched again.
+# Known drafts that already failed in an earlier run without being listed again
+# are dropped from the index rather than retried on every run: they are most
+# likely submitted or withdrawn. Processes sharing an account (parts > 1) walk
+# the whole list, since the index is being rewritten by the others meanwhile.
+async def feed_drafts(context, app_id, progress, queue, worker_count, part=0, parts=1):
+    seen = set()
+    queued = finished = 0
+    incremental = INCREMENTAL_DISCOVERY and parts == 1
+
+    async def offer(url):
+        nonlocal queued, finished
+        global remaining_drafts
+        if draft_shard(url, parts) != part:
+            return
+        if progress.get(url, {}).get("state") == journal.DRAFT_DONE:
+            finished += 1
+            return
+        await queue.put(url)  # waits while the workers are behind
+        # counted once queued, so a put cancelled by stop_feeding is never counted
+        remaining_drafts += 1
+        queued += 1
 
-    for attempt in range(2):
-        try:
-            if step_marker == "start":
-                await page.wait_for_selector("#AppForm_Section_References > div.card-body", timeout=5000)
-                await page.locator("#AppForm_Section_References > div.card-body").click()
-                step_marker = "edit"
-
-            if step_marker == "edit":
-                await page.wait_for_selector("#blk_6806_ApplicationForm\\.Edit_Fieldset_references", timeout=5000)
-                await page.locator("#blk_6806_ApplicationForm\\.Edit_Fieldset_references").click()
-                step_marker = "submit"
-
-            if step_marker == "submit":
-                await page.wait_for_selector("#EditAppFieldset\\.Submit", timeout=5000)
-                await page.locator("#EditAppFieldset\\.Submit").click()
-                await close_toast(page, app_id)
-                step_marker = "complete"
-
-            if step_marker == "complete":
-                await page.wait_for_selector("#blk_6806_ApplicationForm\\.Complete_Section_References", timeout=5000)
-                await page.locator("#blk_6806_ApplicationForm\\.Complete_Section_References").click()
-                update_status(app_id, "[References] Completed")
-                return
+    try:
+        index = await asyncio.to_thread(journal.load_draft_index, app_id) if incremental else {}
+        unchanged = None
+        journal.record_discovery(app_id, False)
+
+        # with a known index the run will probably stop within a page or two
+        async with contextlib.aclosing(discover_drafts(context, app_id, ramp_up=bool(index))) as pages:
+            async for links in pages:
+                for url, marker in links:
+                    # the browser fallback may list drafts the HTTP pass already queued
+                    if url in seen:
+                        continue
+                    if index.get(url) == marker:
+                        unchanged = url
+                        break
+                    seen.add(url)
+                    journal.record_draft_seen(app_id, url, marker)
+                    await offer(url)
+                if unchanged:
+                    break
 
-        except Exception as e:
-            update_status(app_id, f"[References] Retry {attempt + 1}/2: {str(e)}")
-            await page.reload()
-            await page.wait_for_timeout(2000)
+        # the list was walked to its end, or to where the complete index takes over
+        journal.record_discovery(app_id, True)
+
+        if unchanged:
+            update_status(app_id, f"Reached drafts unchanged since the last run ({unchanged}), stopped paging")
+            requeued = 0
+            for url in index:
+                if url in seen:
+                    continue
+                seen.add(url)
+                if progress.get(url, {}).get("state") == journal.DRAFT_FAILED:
+                    journal.forget_draft(app_id, url)
+                    continue
+                if requeued >= INDEX_REQUEUE_LIMIT:
+                    update_status(app_id, f"More known drafts than {INDEX_REQUEUE_LIMIT}, leaving the rest for a later run")
+                    break
+                queued_before = queued
+                await offer(url)
+                requeued += queued - queued_before
+    except Exception as e:
+        update_status(app_id, f"[Discovery Error] {str(e)}")
+    # one stop marker per worker; skipped when cancelled, as no worker is left to read them
+    for _ in range(worker_count):
+        await queue.put(None)
+    return queued, finished
+
+# function to stop discovery once the workers are gone; with nobody reading the
+# queue (e.g. the browser crashed while the tabs opened) it would wait on a full queue forever
+async def stop_feeding(producer, queue):
+    global remaining_drafts
 
-# function to fill equal opportunities 
-async def fill_equal_opportunities(page, app_id):
-    step_marker = "start"
-    update_status(app_id, "[Equal Ops] Starting")
+    if producer.done():
+        return
+    producer.cancel()
+    await asyncio.gather(producer, return_exceptions=True)
+    while not queue.empty():
+        if queue.get_nowait() is not None:
+            remaining_drafts -= 1
+
+# reads the vacancy key, any remote url for the modal and its pre-rendered text in one call
+VACANCY_INFO_JS = """
+() => {
+    const modal = document.querySelector("#VacancyDetailsModal");
+    const body = modal && modal.querySelector(".modal-body");
+    const about = [...document.querySelectorAll("button, a")].find(el => /about this job/i.test(el.textContent));
+    // only the modal identifies the vacancy; a link elsewhere may be site navigation
+    // shared by every draft, so without an id here the cache is skipped
+    const link = modal && modal.querySelector("a[href*='vacancy'], a[href*='/job/']");
+
+    let key = null;
+    if (modal && (modal.dataset.vacancyId || modal.dataset.vacancy)) {
+        key = "vacancy:" + (modal.dataset.vacancyId || modal.dataset.vacancy);
+    } else if (link) {
+        key = "link:" + link.getAttribute("href");
+    }
+
+    // a hidden modal has no layout, so turn block ends into line breaks by hand
+    let text = "";
+    if (body) {
+        const scratch = document.createElement("template");  // inert: nothing loads or runs
+        scratch.innerHTML = body.innerHTML.replace(/<br\\s*\\/?>/gi, "\\n").replace(/<\\/(p|div|li|h[1-6])>/gi, "\\n");
+        text = scratch.content.textContent.replace(/\\n{3,}/g, "\\n\\n").trim();
+    }
+
+    const remote = about && (about.getAttribute("data-url") || about.getAttribute("data-remote") || about.getAttribute("hx-get"));
+    return {key: key, text: text, url: remote || (modal && modal.getAttribute("data-url")) || null};
+}
+"""
+
+# parser that keeps the readable text of an html fragment
+class TextExtractor(HTMLParser):
+    BLOCK_TAGS = {"p", "div", "li", "br", "h1", "h2", "h3", "h4", "h5", "h6", "tr"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skipping += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def text(self):
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+# function to fetch the modal's content over HTTP with the session cookies
+async def fetch_job_description(page, url):
+    full_url = BASE_URL + url if url.startswith("/") else url
+    response = await page.context.request.get(full_url, timeout=10000)
+    if not response.ok:
+        raise Exception(f"HTTP {response.status} for {full_url}")
+    extractor = TextExtractor()
+    extractor.feed(await response.text())
+    extractor.close()
+    return extractor.text()
+
+# function to open the modal and read the description (slowest path)
+async def read_job_description_from_modal(page):
+    await page.get_by_role("button", name="About this job").click()
+    await page.wait_for_selector("#VacancyDetailsModal .modal-body", timeout=5000)
+
+    jd_element = page.locator("#VacancyDetailsModal > div > div > div.modal-body > div")
+    job_description = await jd_element.inner_text()
+
+    await page.locator("#VacancyDetailsModal > div > div > div.modal-header > button").click()
+    return job_description
+
+# function to extract job description, reusing the vacancy cache when possible
+async def extract_job_description(page, app_id):
+    try:
+        info = await page.evaluate(VACANCY_INFO_JS)
+        key = info["key"]
+
+        if key:
+            cached = await asyncio.to_thread(get_job_description, key)
+            if cached:
+                update_status(app_id, f"[Job Desc] Reused cached description ({key})")
+                return cached
+
+        if info["text"]:
+            job_description = info["text"]
+            source = "page"
+        elif info["url"]:
+            job_description = await fetch_job_description(page, info["url"])
+            source = "http"
+        else:
+            update_status(app_id, "[Job Desc] Opening modal")
+            job_description = await read_job_description_from_modal(page)
+            source = "modal"
+
+        if key and job_description:
+            await asyncio.to_thread(store_job_description, key, job_description)
+        update_status(app_id, f"[Job Desc] Extracted successfully from {source}")
+        return job_description
 
-    for attempt in range(2):
-        try:
-            # Step 1: Click "Equal Opportunities" section
-            if step_marker == "start":
-                await page.wait_for_selector("#blk_6806_ApplicationForm\\.Edit_Fieldset_equalops", timeout=5000)
-                await page.locator("#blk_6806_ApplicationForm\\.Edit_Fieldset_equalops").click()
-                step_marker = "save_next_1"
-
-            # Step 2: Click "Save & next" twice
-            if step_marker == "save_next_1":
-                await page.get_by_role("button", name="Save & next").click()
-                await page.wait_for_timeout(1000)
-                await page.get_by_role("button", name="Save & next").click()
-                step_marker = "select_source"
-
-            # Step 3: Select "HJUK" from the job source dropdown
-            if step_marker == "select_source":
-                await page.get_by_label("Please state where you first").select_option("HJUK")
-                step_marker = "save_next_2"
-
-            # Step 4: Click "Save & next" again
-            if step_marker == "save_next_2":
-                await page.get_by_role("button", name="Save & next").click()
-                step_marker = "agree_checkbox"
-
-            # Step 5: Agree to declaration (click the checkbox label)
-            if step_marker == "agree_checkbox":
-                await page.get_by_text("I agree to the above").click()
-                step_marker = "final_save"
-
-            # Step 6: Click Save
-            if step_marker == "final_save":
-                await page.get_by_role("button", name="Save").click()
-                step_marker = "close_modal"
-
-            # Step 7: Close any modal or toast (optional)
-            if step_marker == "close_modal":
-                try:
-                    await page.get_by_role("button", name="Close").click(timeout=3000)
-                except:
-                    pass  # Modal might not show always
-                update_status(app_id, "[Equal Ops] Completed")
-                return
+    except Exception as e:
+        update_status(app_id, f"[Job Desc Error] {str(e)}")
+        return ""
 
-        except Exception as e:
-            update_status(app_id, f"[Equal Ops] Retry {attempt + 1}/2: {str(e)}")
-            await page.reload()
-            await page.wait_for_timeout(2000)
+# function to fill one form section from its spec
+async def fill_section(page, name, app_id, url=None, reauth=None):
+    with span(f"section:{name}", url=url) as section_span:
+        section_span["ok"] = await run_section(
+            page, name, lambda message: update_status(app_id, message, url=url, section=name), reauth=reauth
+        )
+    return section_span["ok"]
 
 
 # the main block of code starts here
 def main():
+    # the GUI toolkit is only needed here; the headless CLI never imports it
+    import PySimpleGUI as sg
+
     sg.theme("SystemDefault")
     layout = [
         [sg.Text("Email:"), sg.Input(key="-EMAIL-")],
         [sg.Text("Password:"), sg.Input(key="-PASSWORD-", password_char="*")],
+        [sg.Text("Or accounts file:"), sg.Input(key="-ACCOUNTS-"), sg.FileBrowse(file_types=(("CSV", "*.csv"), ("All files", "*.*")))],
+        [sg.Text("Concurrent tabs:"), sg.Input(str(DEFAULT_CONCURRENCY), key="-CONCURRENCY-", size=(5, 1))],
         [sg.Text("Drafts Remaining: "), sg.Text("0", key="-DRAFT-COUNT-")],
         [sg.Multiline(size=(70, 12), key="-STATUS-", disabled=True, autoscroll=True)],
         [sg.Button("Start Automation")]
     ]
     window = sg.Window("Job Application Automation", layout, finalize=True)
 
-    def launch_async_automation(email, password):
-        asyncio.run(run_automation(email, password))
+    def launch_async_automation(accounts, concurrency):
+        asyncio.run(run_automation(accounts, concurrency))
+
+    if STATUS_LOG_PATH:
+        sinks.append(jsonl_sink(STATUS_LOG_PATH))
+
+    last_seq = 0
+    shown_lines = 0
 
     while True:
         event, values = window.read(timeout=1000)
@@ -364,16 +831,40 @@ def main():
         if event == "Start Automation":
             email = values["-EMAIL-"]
             password = values["-PASSWORD-"]
-            if email and password:
+            try:
+                concurrency = max(1, int(values["-CONCURRENCY-"]))
+            except ValueError:
+                concurrency = DEFAULT_CONCURRENCY
+            accounts = []
+            if values["-ACCOUNTS-"]:
+                try:
+                    accounts = load_accounts(values["-ACCOUNTS-"])
+                except Exception as e:
+                    update_status("Accounts", f"Could not read accounts file: {str(e)}")
+            elif email and password:
+                accounts = [(email, password)]
+
+            if accounts:
                 window["-EMAIL-"].update(disabled=True)
                 window["-PASSWORD-"].update(disabled=True)
+                window["-ACCOUNTS-"].update(disabled=True)
+                window["-CONCURRENCY-"].update(disabled=True)
                 window["Start Automation"].update(disabled=True)
 
-                threading.Thread(target=launch_async_automation, args=(email, password), daemon=True).start()
-
-        with lock:
-            status_lines = "\n".join([f"{k}: {v}" for k, v in status_dict.items()])
-        window["-STATUS-"].update(status_lines)
+                threading.Thread(target=launch_async_automation, args=(accounts, concurrency), daemon=True).start()
+
+        # append only the events published since the last redraw
+        new_events = events_since(last_seq)
+        if new_events:
+            last_seq = new_events[-1]["seq"]
+            shown_lines += len(new_events)
+            if shown_lines > GUI_MAX_STATUS_LINES:
+                # start a fresh page so the widget never grows without bound
+                window["-STATUS-"].update("")
+                new_events = new_events[-GUI_MAX_STATUS_LINES:]
+                shown_lines = len(new_events)
+            lines = "\n".join(format_event(status_event) for status_event in new_events)
+            window["-STATUS-"].update(lines + "\n", append=True)
         window["-DRAFT-COUNT-"].update(str(remaining_drafts))
 
     window.close()
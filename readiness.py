@@ -0,0 +1,88 @@
+import asyncio
+
+# Condition-based waits shared by the form fillers in new_app.py and old.py.
+# Instead of sleeping for a worst-case guess, each helper waits on whatever
+# real signal the portal gives first: the save request finishing, a new toast
+# appearing or the next fieldset being attached.
+
+TOAST_SELECTOR = "button[data-bs-dismiss='toast']"
+DRAFT_FORM_SELECTOR = "[id^='blk_6806_ApplicationForm']"
+SAVE_TIMEOUT = 10000
+
+
+# function to recognise the form's save round-trip
+def is_save_response(response):
+    request = response.request
+    return request.method in ("POST", "PUT") and request.resource_type in ("xhr", "fetch", "document")
+
+
+# function to wait until the first waiter succeeds; returns its task, or None on timeout
+async def first_ready(waiters, timeout=SAVE_TIMEOUT):
+    tasks = [asyncio.ensure_future(waiter) for waiter in waiters]
+    pending = set(tasks)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout / 1000
+
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            # a waiter that timed out or failed does not count as ready
+            for task in tasks:
+                if task in done and not task.cancelled() and task.exception() is None:
+                    return task
+        return None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# function to click something and wait for the portal to react to it: the save
+# request coming back, a new toast or the next fieldset. A failed save raises
+# "HTTP <status>" and no reaction at all raises TimeoutError, so retry.py can
+# tell a struggling portal from a slow page.
+async def click_and_wait(page, locator, next_selector=None, timeout=SAVE_TIMEOUT):
+    # a toast left over from the previous save must not count as this one's
+    toasts_before = await page.locator(TOAST_SELECTOR).count()
+    save = page.wait_for_event("response", predicate=is_save_response, timeout=timeout)
+    waiters = [
+        save,
+        page.wait_for_function(
+            "([selector, before]) => document.querySelectorAll(selector).length > before",
+            arg=[TOAST_SELECTOR, toasts_before], timeout=timeout,
+        ),
+    ]
+    if next_selector:
+        waiters.append(page.wait_for_selector(next_selector, state="attached", timeout=timeout))
+
+    # start listening before the click so a fast response is not missed
+    tasks = [asyncio.ensure_future(waiter) for waiter in waiters]
+    await asyncio.sleep(0)
+    try:
+        await locator.click(timeout=timeout)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    save_task = tasks[0]
+    ready = await first_ready(tasks, timeout)
+    if ready is None:
+        raise TimeoutError(f"No save, toast or next fieldset within {timeout} ms of the click")
+    # the toast or next fieldset may win the race while the save itself failed
+    if save_task.done() and not save_task.cancelled() and save_task.exception() is None:
+        response = save_task.result()
+        if not response.ok:
+            raise Exception(f"HTTP {response.status} from {response.url}")
+    return ready
+
+
+# function to wait until a draft page has rendered its form
+async def wait_for_draft_ready(page, timeout=15000):
+    await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+    await page.wait_for_selector(DRAFT_FORM_SELECTOR, state="attached", timeout=timeout)
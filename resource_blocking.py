@@ -0,0 +1,161 @@
+import asyncio
+from urllib.parse import urlparse
+
+# Request blocking for browser contexts.
+#
+# The form fillers never look at images, web fonts, media or analytics, so
+# these requests are refused before they leave the browser. Rules are plain
+# data: resource types and hosts to deny, plus hosts that are always allowed.
+# Stylesheets are not blocked by default because Playwright's visibility
+# checks, and the portal's modals and toasts, depend on CSS.
+#
+# On Chromium the rules become URL patterns for the DevTools call
+# Network.setBlockedURLs on every page, so Chromium refuses the requests
+# itself: nothing goes through Python and the HTTP cache stays on (Playwright
+# turns the cache off for any context with a route). Types are matched by file
+# extension there, and allow_hosts only exempts hosts from deny_hosts. Other
+# browsers fall back to routes for the blocked patterns only. Blocked requests
+# are counted from requestfailed events; their size is never downloaded, so
+# the bytes saved are an estimate from typical sizes per type.
+
+DEFAULT_RULES = {
+    "deny_types": {"image", "font", "media"},
+    "deny_hosts": {
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "googleadservices.com",
+        "googlesyndication.com",
+        "facebook.net",
+        "facebook.com",
+        "hotjar.com",
+        "clarity.ms",
+        "linkedin.com",
+        "licdn.com",
+        "bing.com",
+    },
+    "allow_hosts": set(),
+}
+
+# URL patterns standing in for resource types under Network.setBlockedURLs
+TYPE_EXTENSIONS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "mp3", "ogg", "wav", "m4a"],
+    "stylesheet": ["css"],
+    "script": ["js"],
+}
+BLOCKED_FAILURE = "ERR_BLOCKED_BY_CLIENT"
+
+# Blocked requests are never downloaded, so their size is estimated per type
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "font": 60_000,
+    "media": 500_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+blocking_stats = {"blocked": 0, "allowed": 0, "estimated_bytes_saved": 0, "by_type": {}}
+
+
+# function to build a rule set, starting from the defaults
+def make_rules(deny_types=None, deny_hosts=None, allow_hosts=None):
+    return {
+        "deny_types": set(DEFAULT_RULES["deny_types"] if deny_types is None else deny_types),
+        "deny_hosts": set(DEFAULT_RULES["deny_hosts"] if deny_hosts is None else deny_hosts),
+        "allow_hosts": set(DEFAULT_RULES["allow_hosts"] if allow_hosts is None else allow_hosts),
+    }
+
+
+# function to match a host against a list of domains, including subdomains
+def host_matches(host, domains):
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+# function to decide whether a request should be aborted
+def should_block(rules, resource_type, url):
+    host = urlparse(url).hostname or ""
+    if host_matches(host, rules["allow_hosts"]):
+        return False
+    return resource_type in rules["deny_types"] or host_matches(host, rules["deny_hosts"])
+
+
+# function to turn the rules into Network.setBlockedURLs patterns
+def blocked_url_patterns(rules):
+    patterns = []
+    for kind in sorted(rules["deny_types"]):
+        for extension in TYPE_EXTENSIONS.get(kind, []):
+            patterns.extend([f"*.{extension}", f"*.{extension}?*"])
+    for host in sorted(rules["deny_hosts"]):
+        if not host_matches(host, rules["allow_hosts"]):
+            patterns.extend([f"*://{host}/*", f"*://*.{host}/*"])
+    return patterns
+
+
+# function to reset the counters at the start of a run
+def reset_stats():
+    blocking_stats.update({"blocked": 0, "allowed": 0, "estimated_bytes_saved": 0, "by_type": {}})
+
+
+# function to summarise the counters for the status view
+def format_stats():
+    by_type = ", ".join(f"{kind}: {count}" for kind, count in sorted(blocking_stats["by_type"].items()))
+    return (
+        f"Blocked {blocking_stats['blocked']} of {blocking_stats['blocked'] + blocking_stats['allowed']} requests"
+        + (f" [{by_type}]" if by_type else "")
+        + f"; estimated {blocking_stats['estimated_bytes_saved'] / 1_000_000:.1f} MB not downloaded"
+        " (typical sizes per type, not measured)"
+    )
+
+
+# function to count one request that finished or failed
+def count_request(request, failure):
+    if failure and BLOCKED_FAILURE in failure:
+        kind = request.resource_type
+        blocking_stats["blocked"] += 1
+        blocking_stats["estimated_bytes_saved"] += ESTIMATED_BYTES.get(kind, DEFAULT_ESTIMATED_BYTES)
+        blocking_stats["by_type"][kind] = blocking_stats["by_type"].get(kind, 0) + 1
+    else:
+        blocking_stats["allowed"] += 1
+
+
+# function to have Chromium refuse the blocked urls on one page
+async def block_urls(page, patterns):
+    try:
+        session = await page.context.new_cdp_session(page)
+        await session.send("Network.enable")
+        await session.send("Network.setBlockedURLs", {"urls": patterns})
+    except Exception:
+        pass  # the page was closed before it was set up
+
+
+# function to install the blocking rules on a browser context
+async def enable_resource_blocking(context, rules=None):
+    rules = rules or make_rules()
+    patterns = blocked_url_patterns(rules)
+
+    context.on("requestfinished", lambda request: count_request(request, None))
+    context.on("requestfailed", lambda request: count_request(request, request.failure))
+
+    browser = context.browser
+    if browser is not None and browser.browser_type.name == "chromium":
+        # the patterns land while the new page loads its first document, before it asks for images
+        context.on("page", lambda page: asyncio.ensure_future(block_urls(page, patterns)))
+        return
+
+    async def abort(route):
+        if should_block(rules, route.request.resource_type, route.request.url):
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    # only the blocked patterns go through Python; everything else is never routed
+    for kind in sorted(rules["deny_types"]):
+        for extension in TYPE_EXTENSIONS.get(kind, []):
+            await context.route(f"**/*.{extension}*", abort)
+    for host in sorted(rules["deny_hosts"]):
+        if not host_matches(host, rules["allow_hosts"]):
+            await context.route(f"*://{host}/**", abort)
+            await context.route(f"*://*.{host}/**", abort)
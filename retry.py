@@ -0,0 +1,138 @@
+import asyncio
+import random
+
+from readiness import wait_for_draft_ready
+
+# Error-classified retry policy for the form fillers.
+#
+# A failure is sorted into one of a few classes and each class has its own
+# retry budget, exponential backoff with jitter and recovery action:
+#   transient_network  dropped connections, 429/5xx    back off, reload the page
+#   selector_timeout   element late or missing         short pause, retry in place
+#   validation         the portal rejected the input   no retry, same input fails again
+#   auth_lost          session expired, login form     log in again once, then reload
+#   unknown            anything else                   one retry after a reload
+# Only the classes that need it pay for a full page load.
+
+TRANSIENT_NETWORK = "transient_network"
+SELECTOR_TIMEOUT = "selector_timeout"
+VALIDATION = "validation"
+AUTH_LOST = "auth_lost"
+UNKNOWN = "unknown"
+
+RETRY_POLICIES = {
+    TRANSIENT_NETWORK: {"retries": 4, "base_delay": 1.0, "max_delay": 15.0, "jitter": 0.5, "recovery": "reload"},
+    SELECTOR_TIMEOUT: {"retries": 2, "base_delay": 0.25, "max_delay": 2.0, "jitter": 0.2, "recovery": None},
+    VALIDATION: {"retries": 0, "base_delay": 0.0, "max_delay": 0.0, "jitter": 0.0, "recovery": None},
+    AUTH_LOST: {"retries": 1, "base_delay": 0.0, "max_delay": 0.0, "jitter": 0.0, "recovery": "login"},
+    UNKNOWN: {"retries": 1, "base_delay": 1.0, "max_delay": 5.0, "jitter": 0.5, "recovery": "reload"},
+}
+
+NETWORK_ERROR_MARKERS = (
+    "net::ERR_", "ECONNRESET", "ECONNREFUSED", "ETIMEDOUT", "socket hang up",
+    "Connection closed", "HTTP 429", "HTTP 5",
+)
+LOGIN_FORM_SELECTOR = "input[name='FrmCoreLogin-CandidateSignIn_Email']"
+
+# Looks at the page once after a failure: a login form means the session is
+# gone, visible validation messages mean the portal rejected the input.
+PAGE_PROBLEM_JS = """
+(loginSelector) => {
+    if (document.querySelector(loginSelector)) return "auth_lost";
+    const invalid = document.querySelector(
+        ".validation-summary-errors, .field-validation-error:not(:empty), .invalid-feedback.d-block, [aria-invalid='true']"
+    );
+    return invalid ? "validation" : null;
+}
+"""
+
+
+class AuthenticationLost(Exception):
+    pass
+
+
+class ValidationFailed(Exception):
+    pass
+
+
+# function to classify a failure from the exception alone
+def classify_error(error):
+    if isinstance(error, AuthenticationLost):
+        return AUTH_LOST
+    if isinstance(error, ValidationFailed):
+        return VALIDATION
+    if any(marker in str(error) for marker in NETWORK_ERROR_MARKERS):
+        return TRANSIENT_NETWORK
+    # Playwright's TimeoutError (async and sync API) without importing it here
+    if type(error).__name__ == "TimeoutError":
+        return SELECTOR_TIMEOUT
+    return UNKNOWN
+
+
+# function to sort a failure into one of the retry classes, looking at the
+# page when the exception alone is not conclusive
+async def classify(error, page=None):
+    kind = classify_error(error)
+    if kind not in (SELECTOR_TIMEOUT, UNKNOWN) or page is None:
+        return kind
+
+    try:
+        if "/login" in page.url:
+            return AUTH_LOST
+        problem = await page.evaluate(PAGE_PROBLEM_JS, LOGIN_FORM_SELECTOR)
+    except Exception:
+        # the page itself is unusable, so start it over
+        return TRANSIENT_NETWORK
+    return problem or kind
+
+
+# function to count a retry against its class budget, False when it is spent
+def take_retry(budget, kind):
+    budget[kind] = budget.get(kind, 0) + 1
+    return budget[kind] <= RETRY_POLICIES[kind]["retries"]
+
+
+# function to compute the exponential backoff with jitter for the nth retry
+def backoff_delay(kind, attempt):
+    policy = RETRY_POLICIES[kind]
+    delay = min(policy["max_delay"], policy["base_delay"] * 2 ** (attempt - 1))
+    return delay * (1 + random.uniform(-policy["jitter"], policy["jitter"]))
+
+
+# function to bring the page back to a usable state before retrying;
+# returns True when the page was reloaded (so the form starts over)
+async def recover(page, kind, reauth=None):
+    recovery = RETRY_POLICIES[kind]["recovery"]
+    if recovery == "login":
+        if reauth is None or not await reauth():
+            raise AuthenticationLost("Session expired and could not log in again")
+        recovery = "reload"
+    if recovery == "reload":
+        await page.reload(wait_until="domcontentloaded")
+        await wait_for_draft_ready(page)
+        return True
+    return False
+
+
+# function to wait out the backoff and recover; returns the same as recover()
+async def prepare_retry(page, kind, attempt, reauth=None):
+    await asyncio.sleep(backoff_delay(kind, attempt))
+    return await recover(page, kind, reauth)
+
+
+# function to retry an operation that starts over by itself (e.g. page.goto),
+# so no reload is needed; only a lost session triggers reauth
+async def call_with_retry(operation, page=None, reauth=None, on_retry=None):
+    budget = {}
+    while True:
+        try:
+            return await operation()
+        except Exception as e:
+            kind = await classify(e, page)
+            if not take_retry(budget, kind):
+                raise
+            if on_retry:
+                on_retry(kind, budget[kind], e)
+            await asyncio.sleep(backoff_delay(kind, budget[kind]))
+            if kind == AUTH_LOST and (reauth is None or not await reauth()):
+                raise AuthenticationLost("Session expired and could not log in again") from e
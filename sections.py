@@ -0,0 +1,334 @@
+from functools import lru_cache
+
+from readiness import SAVE_TIMEOUT, TOAST_SELECTOR, click_and_wait, wait_for_draft_ready
+from retry import RETRY_POLICIES, classify, prepare_retry, take_retry
+from timing import span
+
+# Declarative description of the application form sections.
+#
+# Every section is a list of steps. A step names an action, the element it
+# acts on and, where needed, a value. "bulk_fill" steps carry a mapping of
+# CSS selector -> value instead and set all of those fields in one
+# round-trip (see bulk_fill). Targets are one of:
+#   ("css", selector)   ("role", role, name)   ("text", text)   ("label", text)
+# Adding a section to the automation is a matter of adding an entry here.
+
+SAVE_NEXT = ("role", "button", "Save & next")
+SAVE = ("role", "button", "Save")
+
+
+def edit_button(key):
+    return ("css", f"#blk_6806_ApplicationForm\\.Edit_Fieldset_{key}")
+
+
+def complete_button(key):
+    return ("css", f"#blk_6806_ApplicationForm\\.Complete_Section_{key}")
+
+
+SECTION_SPECS = {
+    "personal": {
+        "edit": edit_button("persdetails"),
+        "label": "Personal",
+        "complete": complete_button("PersDetails"),
+        "steps": [
+            {"name": "start", "action": "click", "target": edit_button("persdetails")},
+            {"name": "checkbox", "action": "bulk_fill", "target": ("css", "#EditAppFieldset\\.personal-preferredemployment_Fulltime"),
+             "fields": {"#EditAppFieldset\\.personal-preferredemployment_Fulltime": True}},
+            {"name": "save_and_next", "action": "save_next", "target": SAVE_NEXT, "repeat": 2,
+             "next": "#EditAppFieldset_crbquestions", "timeout": 10000},
+            {"name": "dropdowns", "action": "bulk_fill", "target": ("css", "#EditAppFieldset_crbquestions > div.fieldset-fields select"),
+             "fields": {"#EditAppFieldset_crbquestions > div.fieldset-fields select": "N"}},
+            {"name": "final_save", "action": "save", "target": SAVE},
+            {"name": "close_toast", "action": "close_toast"},
+            {"name": "complete", "action": "click", "target": complete_button("PersDetails")},
+        ],
+    },
+    "references": {
+        "edit": edit_button("references"),
+        "label": "References",
+        "complete": complete_button("References"),
+        "steps": [
+            {"name": "start", "action": "click", "target": ("css", "#AppForm_Section_References > div.card-body")},
+            {"name": "edit", "action": "click", "target": edit_button("references")},
+            {"name": "submit", "action": "save", "target": ("css", "#EditAppFieldset\\.Submit"),
+             "next": "#blk_6806_ApplicationForm\\.Complete_Section_References"},
+            {"name": "close_toast", "action": "close_toast"},
+            {"name": "complete", "action": "click", "target": complete_button("References")},
+        ],
+    },
+    "equalops": {
+        "edit": edit_button("equalops"),
+        "label": "Equal Ops",
+        "complete": complete_button("EqualOps"),
+        "steps": [
+            {"name": "start", "action": "click", "target": edit_button("equalops")},
+            {"name": "save_next_1", "action": "save_next", "target": SAVE_NEXT, "repeat": 2},
+            {"name": "select_source", "action": "select", "target": ("label", "Please state where you first"), "value": "HJUK"},
+            {"name": "save_next_2", "action": "save_next", "target": SAVE_NEXT},
+            {"name": "agree_checkbox", "action": "click", "target": ("text", "I agree to the above")},
+            {"name": "final_save", "action": "save", "target": SAVE},
+            {"name": "close_modal", "action": "click", "target": ("role", "button", "Close"), "optional": True, "timeout": 3000},
+            {"name": "complete", "action": "click", "target": complete_button("EqualOps"), "optional": True},
+        ],
+    },
+}
+
+# Sections that only need to be stepped through with "Save & next"
+# before Supporting Info (see old.py:fill_all_sections_until_supporting_info).
+for key, label in [
+    ("genedu", "Education & Qualifications"),
+    ("gentraining", "Training Courses"),
+    ("profmembership", "Professional Bodies"),
+    ("nhsservice", "NHS Service"),
+    ("emphistory", "Employer history"),
+    ("gaps", "Gaps in employment"),
+]:
+    SECTION_SPECS[key] = {
+        "edit": edit_button(key),
+        "label": label,
+        "complete": None,
+        "steps": [
+            {"name": "start", "action": "click", "target": edit_button(key), "timeout": 6000},
+            {"name": "save_next", "action": "save_next_while_visible", "target": SAVE_NEXT, "repeat": 5},
+        ],
+    }
+
+# The remaining sections only become visible after a reload
+SECTION_SPECS["gaps"]["steps"].append({"name": "reload", "action": "reload"})
+
+STANDARD_SECTIONS = ["genedu", "gentraining", "profmembership", "nhsservice", "emphistory", "gaps"]
+
+DEFAULT_STEP_TIMEOUT = 5000
+SAVE_ACTIONS = ("save", "save_next", "save_next_while_visible")  # wait for the portal, so default to SAVE_TIMEOUT
+
+
+# Reads every section's state in one round-trip. A section only counts as
+# complete on positive evidence: its "Complete section" button is disabled or
+# reads as completed, or the section card's status badge says complete. An
+# enabled button or an "incomplete" badge means not complete. A missing button
+# alone proves nothing (it may simply not be rendered yet), so without a
+# status the section reports null and is run; the same goes for sections
+# without a completion marker.
+SECTION_STATUS_JS = """
+(sections) => {
+    const result = {};
+    for (const [name, edit, complete] of sections) {
+        const editButton = edit && document.querySelector(edit);
+        if (!editButton || !complete) {
+            result[name] = null;
+            continue;
+        }
+        const button = document.querySelector(complete);
+        if (button) {
+            result[name] = button.disabled
+                || button.getAttribute("aria-disabled") === "true"
+                || /\\bcompleted\\b/i.test(button.textContent || "");
+            continue;
+        }
+        const card = editButton.closest(".card, [id^='AppForm_Section_']");
+        const badge = card && card.querySelector(".badge, .status, [class*='status']");
+        const status = badge ? badge.textContent.trim() : "";
+        if (/\\b(incomplete|not complete|in progress)\\b/i.test(status)) {
+            result[name] = false;
+        } else if (/\\bcompleted?\\b/i.test(status)) {
+            result[name] = true;
+        } else {
+            result[name] = null;
+        }
+    }
+    return result;
+}
+"""
+
+
+# Sets many fields in one round-trip. Every selector may match several
+# elements; a select gets the option whose value (or text) matches, a
+# checkbox/radio is clicked into the wanted state and any other input gets its
+# value through the native setter so framework listeners see it. Each change
+# fires input and change events. Returns per selector how many elements
+# matched, changed or were skipped (disabled, hidden checkbox, no such option).
+BULK_FILL_JS = """
+(fields) => {
+    const fire = (el) => {
+        el.dispatchEvent(new Event("input", { bubbles: true }));
+        el.dispatchEvent(new Event("change", { bubbles: true }));
+    };
+    const result = {};
+    for (const [selector, value] of fields) {
+        const outcome = { matched: 0, changed: 0, skipped: 0 };
+        for (const el of document.querySelectorAll(selector)) {
+            outcome.matched += 1;
+            if (el.disabled) {
+                outcome.skipped += 1;
+                continue;
+            }
+            if (el.tagName === "SELECT") {
+                const wanted = String(value);
+                const option = Array.from(el.options).find(o => o.value === wanted)
+                    || Array.from(el.options).find(o => o.text.trim() === wanted);
+                if (!option) {
+                    outcome.skipped += 1;
+                } else if (el.value !== option.value) {
+                    el.value = option.value;
+                    fire(el);
+                    outcome.changed += 1;
+                }
+            } else if (el.type === "checkbox" || el.type === "radio") {
+                if (!el.getClientRects().length) {
+                    outcome.skipped += 1;
+                } else if (el.checked !== Boolean(value)) {
+                    el.click();  // fires click, input and change like a user would
+                    outcome.changed += 1;
+                }
+            } else if (el.value !== String(value)) {
+                const proto = el.tagName === "TEXTAREA" ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+                Object.getOwnPropertyDescriptor(proto, "value").set.call(el, String(value));
+                fire(el);
+                outcome.changed += 1;
+            }
+        }
+        result[selector] = outcome;
+    }
+    return result;
+}
+"""
+
+
+# function to turn a target tuple into a page -> Locator factory
+def make_locator(target):
+    kind = target[0]
+    if kind == "css":
+        return lambda page: page.locator(target[1])
+    if kind == "role":
+        return lambda page: page.get_by_role(target[1], name=target[2])
+    if kind == "text":
+        return lambda page: page.get_by_text(target[1])
+    if kind == "label":
+        return lambda page: page.get_by_label(target[1])
+    raise ValueError(f"Unknown target type: {kind}")
+
+
+# function to compile a section spec once per process
+@lru_cache(maxsize=None)
+def compile_section(name):
+    spec = SECTION_SPECS[name]
+    steps = []
+    for step in spec["steps"]:
+        compiled = dict(step)
+        compiled["locate"] = make_locator(step["target"]) if "target" in step else None
+        compiled.setdefault("timeout", SAVE_TIMEOUT if step["action"] in SAVE_ACTIONS else DEFAULT_STEP_TIMEOUT)
+        compiled.setdefault("repeat", 1)
+        compiled.setdefault("optional", False)
+        steps.append(compiled)
+    return spec["label"], tuple(steps)
+
+
+# function to read which sections are already complete with one page.evaluate
+async def read_section_status(page, names):
+    sections = []
+    for name in names:
+        spec = SECTION_SPECS[name]
+        complete = spec["complete"][1] if spec["complete"] else None
+        edit = spec["edit"][1] if spec["edit"] else None
+        sections.append([name, edit, complete])
+    return await page.evaluate(SECTION_STATUS_JS, sections)
+
+
+# function to set a mapping of CSS selector -> value with one page.evaluate
+async def bulk_fill(page, fields):
+    results = await page.evaluate(BULK_FILL_JS, [[selector, value] for selector, value in fields.items()])
+    missing = [selector for selector, outcome in results.items() if not outcome["matched"]]
+    if missing:
+        raise ValueError(f"No elements for: {', '.join(missing)}")
+    return results
+
+
+# function to perform one step on the page
+async def run_step(page, step):
+    locator = step["locate"](page) if step["locate"] else None
+    action = step["action"]
+    timeout = step["timeout"]
+
+    if action == "click":
+        await locator.click(timeout=timeout)
+
+    elif action == "select":
+        await locator.select_option(step["value"], timeout=timeout)
+
+    elif action == "bulk_fill":
+        if locator is not None:
+            await locator.first.wait_for(timeout=timeout)
+        await bulk_fill(page, step["fields"])
+
+    elif action == "save_next":
+        await locator.wait_for(timeout=timeout)
+        for i in range(step["repeat"]):
+            last = i == step["repeat"] - 1
+            await click_and_wait(page, locator, next_selector=step.get("next") if last else None, timeout=timeout)
+
+    elif action == "save_next_while_visible":
+        for _ in range(step["repeat"]):
+            try:
+                await locator.wait_for(timeout=3000)
+            except Exception:
+                break
+            await click_and_wait(page, locator, timeout=timeout)
+
+    elif action == "save":
+        await click_and_wait(page, locator, next_selector=step.get("next"), timeout=timeout)
+
+    elif action == "close_toast":
+        try:
+            await page.wait_for_selector(TOAST_SELECTOR, timeout=3000)
+            await page.get_by_role("button", name="Close", exact=True).click()
+        except Exception:
+            pass
+
+    elif action == "reload":
+        await page.reload(wait_until="domcontentloaded")
+        await wait_for_draft_ready(page)
+
+    else:
+        raise ValueError(f"Unknown step action: {action}")
+
+
+# function to run a section, resuming from the last completed step on retry.
+# Failures are classified by retry.py; only network errors, unknown errors and
+# a lost session reload the page, which starts the section over.
+async def run_section(page, name, on_status=print, progress=None, reauth=None):
+    label, steps = compile_section(name)
+    progress = {} if progress is None else progress
+    on_status(f"[{label}] Starting")
+
+    budget = {}
+    pending = None  # (error class, retry number) to recover from before the next try
+
+    while True:
+        try:
+            if pending:
+                if await prepare_retry(page, *pending, reauth=reauth):
+                    progress[name] = 0
+                pending = None
+
+            while progress.get(name, 0) < len(steps):
+                step = steps[progress.get(name, 0)]
+                # retried steps are timed separately so their cost shows up in the report
+                with span(f"retry:{name}" if budget else f"step:{name}.{step['name']}", category="section"):
+                    try:
+                        await run_step(page, step)
+                    except Exception:
+                        if not step["optional"]:
+                            raise
+                progress[name] = progress.get(name, 0) + 1
+
+            on_status(f"[{label}] Completed")
+            return True
+
+        except Exception as e:
+            step_name = steps[min(progress.get(name, 0), len(steps) - 1)]["name"]
+            kind = await classify(e, page)
+            if not take_retry(budget, kind):
+                on_status(f"[{label}] Failed at '{step_name}' ({kind}): {str(e)}")
+                return False
+            on_status(f"[{label}] Retry {budget[kind]}/{RETRY_POLICIES[kind]['retries']} at '{step_name}' ({kind}): {str(e)}")
+            pending = (kind, budget[kind])
@@ -0,0 +1,98 @@
+import hashlib
+import os
+
+from timing import span
+
+# Saved logins shared by new_app.py (async API) and main.py (sync API).
+#
+# After a login the context's cookies and storage are written to a file per
+# portal and account under SESSION_DIR. The next run restores the file into
+# a new context and checks it with one authenticated request: an expired
+# session is redirected away from the dashboard to the sign-in page. Only
+# when that fails does the caller go through the login form again. Functions
+# ending in _sync are the same steps for Playwright's sync API.
+
+BASE_URL = os.environ.get("TRAC_BASE_URL", "https://apps.trac.jobs").rstrip("/")  # point at mock_portal.py for offline runs
+DASHBOARD_URL = f"{BASE_URL}/dashboard"
+SESSION_DIR = "sessions"
+SESSION_CHECK_TIMEOUT = 8000
+
+
+# function to get the saved session file for an account on this portal
+def session_state_path(email):
+    key = f"{BASE_URL}|{email.strip().lower()}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SESSION_DIR, f"state_{digest}.json")
+
+
+# function to tell whether a dashboard request came back logged in
+def is_logged_in(response):
+    return response.ok and response.url.startswith(DASHBOARD_URL)
+
+
+# function to check a restored session with one authenticated request
+async def session_is_valid(context, on_status=print, account=None):
+    try:
+        with span("session_check", account=account):
+            response = await context.request.get(DASHBOARD_URL, timeout=SESSION_CHECK_TIMEOUT)
+        return is_logged_in(response)
+    except Exception as e:
+        on_status(f"Session check error: {str(e)}")
+        return False
+
+
+def session_is_valid_sync(context, on_status=print):
+    try:
+        return is_logged_in(context.request.get(DASHBOARD_URL, timeout=SESSION_CHECK_TIMEOUT))
+    except Exception as e:
+        on_status(f"Session check error: {str(e)}")
+        return False
+
+
+# function to restore the saved session into a new context; returns None when
+# there is none or it expired. new_context(**options) creates the context.
+async def restore_session(new_context, email, on_status=print, account=None):
+    state_path = session_state_path(email)
+    if not os.path.exists(state_path):
+        return None
+
+    on_status("Restoring saved session")
+    context = await new_context(storage_state=state_path)
+    if await session_is_valid(context, on_status, account):
+        on_status("Saved session is still valid, skipping login")
+        return context
+    on_status("Saved session expired, logging in again")
+    await context.close()
+    return None
+
+
+def restore_session_sync(new_context, email, on_status=print):
+    state_path = session_state_path(email)
+    if not os.path.exists(state_path):
+        return None
+
+    on_status("Restoring saved session")
+    context = new_context(storage_state=state_path)
+    if session_is_valid_sync(context, on_status):
+        on_status("Saved session is still valid, skipping login")
+        return context
+    on_status("Saved session expired, logging in again")
+    context.close()
+    return None
+
+
+# function to save a logged-in context for the next run
+async def save_session(context, email, on_status=print):
+    try:
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        await context.storage_state(path=session_state_path(email))
+    except Exception as e:
+        on_status(f"Could not save session: {str(e)}")
+
+
+def save_session_sync(context, email, on_status=print):
+    try:
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        context.storage_state(path=session_state_path(email))
+    except Exception as e:
+        on_status(f"Could not save session: {str(e)}")
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import queue
+
+import generation
+import new_app
+import status_bus
+import timing
+
+# Process-pool mode.
+#
+#   python -m cli run --accounts accounts.csv --concurrency 32 --processes 4
+#
+# One event loop driving one Chromium tops out at a handful of tabs, so the
+# work is split over several spawned processes, each with its own browser and
+# event loop. With at least as many accounts as processes the accounts are
+# dealt out round robin. Otherwise each account is shared by several
+# processes: every one of them walks the draft list but only fills the drafts
+# whose url hashes to its part (new_app.draft_shard), and the account's
+# session is saved once up front so they do not all log in at once. Children
+# forward every status event to the parent over a multiprocessing queue and
+# send their timing spans when they finish, so the parent's status view,
+# latency summary and trace cover the whole run.
+
+POLL_INTERVAL = 0.5
+
+# module globals the CLI may have changed that a spawned child has to see
+# (TRAC_BASE_URL and other environment settings are inherited anyway)
+SHARED_SETTINGS = [
+    (new_app, "BLOCK_RESOURCES"),
+    (new_app, "RESUME_PATH"),
+    (new_app, "DISCOVERY_MODE"),
+    (new_app, "INCREMENTAL_DISCOVERY"),
+    (generation, "BACKEND"),
+]
+
+
+# function to split a number of tabs as evenly as possible
+def split_evenly(total, count):
+    base, extra = divmod(max(total, count), count)
+    return [base + (1 if i < extra else 0) for i in range(count)]
+
+
+# function to decide which process runs which account (and which part of it)
+def plan_shards(accounts, processes):
+    if len(accounts) >= processes:
+        shards = [[] for _ in range(processes)]
+        for i, (email, password) in enumerate(accounts):
+            shards[i % processes].append((email, password, 0, 1))
+        return shards
+
+    shards = []
+    for (email, password), parts in zip(accounts, split_evenly(processes, len(accounts))):
+        shards.extend([(email, password, part, parts)] for part in range(parts))
+    return shards
+
+
+# entry point of a child process
+def run_shard(index, accounts, concurrency, max_concurrency, headless, settings, events):
+    for (module, name), value in zip(SHARED_SETTINGS, settings):
+        setattr(module, name, value)
+    new_app.TRACE_PATH = None  # the parent writes one trace for the whole run
+    new_app.USE_BROWSER_SERVER = False  # every process drives a browser of its own
+
+    def forward(event):
+        events.put(("event", index, event, new_app.remaining_drafts))
+
+    status_bus.sinks[:] = [forward]
+    try:
+        asyncio.run(new_app.run_automation(accounts, concurrency, headless=headless, max_concurrency=max_concurrency))
+    finally:
+        events.put(("done", index, timing.spans, timing.origin_wall))
+
+
+# function to run the automation in several processes and collect their results
+def run_sharded(accounts, processes, concurrency=new_app.DEFAULT_CONCURRENCY, headless=True, max_concurrency=None):
+    shards = [shard for shard in plan_shards(accounts, processes) if shard]
+    new_app.remaining_drafts = 0
+    timing.reset_spans()
+
+    shared = sorted({(email, password) for shard in shards for email, password, _part, parts in shard if parts > 1})
+    if shared:
+        new_app.update_status("Automation", f"Saving sessions for {len(shared)} accounts shared by several processes")
+        asyncio.run(new_app.prepare_sessions(shared, headless=headless))
+
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    settings = [getattr(module, name) for module, name in SHARED_SETTINGS]
+    tab_budgets = split_evenly(concurrency, len(shards))
+    max_budgets = split_evenly(max(concurrency, max_concurrency or new_app.MAX_CONCURRENCY), len(shards))
+
+    workers = [
+        context.Process(
+            target=run_shard, name=f"shard {i + 1}",
+            args=(i, shard, tab_budgets[i], max_budgets[i], headless, settings, events),
+        )
+        for i, shard in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    new_app.update_status("Automation", f"Started {len(workers)} processes for {len(accounts)} accounts")
+
+    remaining = {}
+    finished = set()
+    while len(finished) < len(workers):
+        try:
+            message = events.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            # a child that died without saying goodbye would otherwise be waited on forever
+            for i, worker in enumerate(workers):
+                if i not in finished and not worker.is_alive():
+                    finished.add(i)
+                    new_app.update_status("Automation", f"[Shard {i + 1} Error] exited with code {worker.exitcode}")
+            continue
+
+        kind, index = message[0], message[1]
+        if kind == "event":
+            event, remaining[index] = message[2], message[3]
+            new_app.remaining_drafts = sum(remaining.values())
+            new_app.update_status(event["app_id"], event["message"], url=event["url"],
+                                  section=event["section"], level=event["level"])
+        elif kind == "done":
+            finished.add(index)
+            timing.merge_spans(message[2], message[3], f"shard {index + 1}")
+
+    for worker in workers:
+        worker.join()
+
+    new_app.update_status("Timing", "Latency summary (all processes)\n" + timing.format_summary())
+    if new_app.TRACE_PATH:
+        timing.export_chrome_trace(new_app.TRACE_PATH)
+        new_app.update_status("Timing", f"Chrome trace written to {new_app.TRACE_PATH}")
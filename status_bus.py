@@ -0,0 +1,80 @@
+import collections
+import itertools
+import json
+import threading
+import time
+
+# Structured status events.
+#
+# Every status update becomes an event dict (seq, ts, app_id, url, section,
+# level, message) appended to a bounded ring buffer. Appending to a deque and
+# drawing the next sequence number are atomic in CPython, so publishers never
+# take a lock. Readers such as the GUI keep the last sequence number they saw
+# and ask for newer events only. Sinks receive every event as it is published.
+
+EVENT_BUFFER_SIZE = 5000
+
+events = collections.deque(maxlen=EVENT_BUFFER_SIZE)
+sequence = itertools.count(1)
+sinks = []
+
+
+# function to guess a level from the wording of older status messages
+def infer_level(message):
+    lowered = message.lower()
+    if "error" in lowered or "failed" in lowered or "incomplete" in lowered:
+        return "error"
+    if "retry" in lowered or "expired" in lowered:
+        return "warning"
+    return "info"
+
+
+# function to publish one status event to the buffer and every sink
+def publish(app_id, message, url=None, section=None, level=None):
+    event = {
+        "seq": next(sequence),
+        "ts": time.time(),
+        "app_id": app_id,
+        "url": url,
+        "section": section,
+        "level": level or infer_level(message),
+        "message": message,
+    }
+    events.append(event)
+    for sink in sinks:
+        try:
+            sink(event)
+        except Exception as e:
+            print(f"[Status Sink Error] {e}")
+    return event
+
+
+# function to get the events newer than a sequence number
+def events_since(last_seq):
+    # copying the deque is a single C call, so no lock is needed against publishers
+    return [event for event in events.copy() if event["seq"] > last_seq]
+
+
+# function to render an event as one status line
+def format_event(event):
+    clock = time.strftime("%H:%M:%S", time.localtime(event["ts"]))
+    return f"{clock} {event['app_id']}: {event['message']}"
+
+
+# sink that appends every event to a JSONL file
+def jsonl_sink(path, flush_interval=1.0):
+    log_file = open(path, "a", encoding="utf-8")
+    write_lock = threading.Lock()
+    last_flush = [time.monotonic()]
+
+    def sink(event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with write_lock:
+            log_file.write(line)
+            # flush at most once per interval, and always on errors
+            if event["level"] == "error" or time.monotonic() - last_flush[0] >= flush_interval:
+                log_file.flush()
+                last_flush[0] = time.monotonic()
+
+    sink.close = log_file.close
+    return sink
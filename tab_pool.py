@@ -0,0 +1,153 @@
+import asyncio
+
+# Pool of warm tabs for one browser context.
+#
+# Opening and closing a tab per draft creates and tears down a renderer each
+# time. Workers take a tab from the pool instead and give it back when the
+# draft is done. A returned tab is navigated to about:blank, which drops the
+# draft's DOM and doubles as a health check; a tab that fails it, has served
+# MAX_USES_PER_TAB drafts or whose JS heap grew more than
+# MAX_HEAP_GROWTH_BYTES since it was new is closed and replaced on demand,
+# so renderer leaks cannot build up. The heap size comes from the DevTools
+# Performance domain: performance.memory is bucketed and only refreshed every
+# few minutes without --enable-precise-memory-info.
+#
+# Pools of one run share an open_tabs counter, so the idle tabs of all
+# accounts together stay within the one tab limit.
+
+MAX_USES_PER_TAB = 25
+MAX_HEAP_GROWTH_BYTES = 64 * 1024 * 1024
+RESET_TIMEOUT = 5000
+
+
+# dialog handler: leave the page on beforeunload prompts, dismiss anything else
+async def answer_dialog(dialog):
+    try:
+        if dialog.type == "beforeunload":
+            await dialog.accept()
+        else:
+            await dialog.dismiss()
+    except Exception:
+        pass
+
+
+class TabPool:
+    def __init__(self, context, max_uses=MAX_USES_PER_TAB, max_heap_growth=MAX_HEAP_GROWTH_BYTES, open_tabs=None):
+        self.context = context
+        self.max_uses = max_uses
+        self.max_heap_growth = max_heap_growth
+        self.open_tabs = {"count": 0} if open_tabs is None else open_tabs
+        self.idle = []
+        self.tabs = {}  # page -> {"uses", "heap_baseline", "cdp"}
+        self.created = 0
+        self.recycled = 0
+
+    # function to open a tab; reserved=True when the caller already counted it
+    async def new_tab(self, reserved=False):
+        if not reserved:
+            self.open_tabs["count"] += 1
+        try:
+            page = await self.context.new_page()
+        except BaseException:
+            self.open_tabs["count"] -= 1
+            raise
+        page.on("dialog", lambda dialog: asyncio.ensure_future(answer_dialog(dialog)))
+        self.tabs[page] = {"uses": 0, "heap_baseline": None, "cdp": await self.open_cdp_session(page)}
+        self.created += 1
+        return page
+
+    # function to open the DevTools session the heap size is read from (Chromium only)
+    async def open_cdp_session(self, page):
+        try:
+            session = await self.context.new_cdp_session(page)
+            await session.send("Performance.enable")
+            return session
+        except Exception:
+            return None
+
+    async def js_heap_size(self, tab):
+        if tab["cdp"] is None:
+            return None
+        result = await tab["cdp"].send("Performance.getMetrics")
+        return next((metric["value"] for metric in result["metrics"] if metric["name"] == "JSHeapUsedSize"), None)
+
+    # function to open tabs ahead of time so the first drafts do not wait for them;
+    # never takes the open tabs of all pools past limit
+    async def warm(self, count, limit=None):
+        count -= len(self.idle)
+        if limit is not None:
+            count = min(count, limit - self.open_tabs["count"])
+        count = max(count, 0)
+        # reserved up front so pools warming at the same time see each other's tabs
+        self.open_tabs["count"] += count
+        results = await asyncio.gather(*(self.new_tab(reserved=True) for _ in range(count)), return_exceptions=True)
+        # tabs that did open stay usable even when others failed
+        self.idle.extend(page for page in results if not isinstance(page, BaseException))
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def acquire(self):
+        while self.idle:
+            page = self.idle.pop()
+            if not page.is_closed():
+                self.tabs[page]["uses"] += 1
+                return page
+            self.forget(page)
+        page = await self.new_tab()
+        self.tabs[page]["uses"] += 1
+        return page
+
+    # function to give a tab back; reusable=False (e.g. after a failed draft) closes it
+    async def release(self, page, reusable=True):
+        tab = self.tabs.get(page)
+        if tab is None or page.is_closed():
+            self.forget(page)
+            return
+
+        if reusable and tab["uses"] < self.max_uses:
+            try:
+                await page.goto("about:blank", timeout=RESET_TIMEOUT)
+                heap = await self.js_heap_size(tab)
+                if tab["heap_baseline"] is None:
+                    tab["heap_baseline"] = heap
+                elif heap is not None and heap - tab["heap_baseline"] > self.max_heap_growth:
+                    reusable = False
+            except Exception:
+                reusable = False
+        else:
+            reusable = False
+
+        if reusable:
+            self.idle.append(page)
+        else:
+            self.recycled += 1
+            await self.discard(page)
+
+    # function to stop counting a tab that is already closed or about to be
+    def forget(self, page):
+        if self.tabs.pop(page, None) is not None:
+            self.open_tabs["count"] -= 1
+
+    async def discard(self, page):
+        cdp = self.tabs.get(page, {}).get("cdp")
+        self.forget(page)
+        try:
+            if cdp is not None:
+                await cdp.detach()
+        except Exception:
+            pass
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    # function to close idle tabs while the open tabs of all pools are over the limit
+    # (e.g. after the tab limit dropped)
+    async def trim(self, limit):
+        while self.idle and self.open_tabs["count"] > limit:
+            await self.discard(self.idle.pop(0))
+
+    async def close(self):
+        while self.idle:
+            await self.discard(self.idle.pop(0))
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+import browser_server
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX file ownership")
+
+
+@pytest.fixture
+def answering_port(monkeypatch):
+    monkeypatch.delenv("BROWSER_ENDPOINT", raising=False)
+    monkeypatch.setattr(browser_server, "devtools_json", lambda port, path, timeout=2: {"Browser": "Chrome"})
+
+
+def write_state_file(path, mode):
+    path.write_text(json.dumps({"pid": 1, "port": 9333}), encoding="utf-8")
+    os.chmod(path, mode)
+
+
+def test_own_private_state_file_is_used(tmp_path, answering_port):
+    path = tmp_path / "state.json"
+    write_state_file(path, 0o600)
+    assert browser_server.server_endpoint(str(path)) == "http://127.0.0.1:9333"
+
+
+@pytest.mark.parametrize("mode", [0o620, 0o602, 0o666])
+def test_state_file_writable_by_others_is_ignored(tmp_path, answering_port, mode):
+    path = tmp_path / "state.json"
+    write_state_file(path, mode)
+    assert browser_server.server_endpoint(str(path)) is None
+
+
+def test_state_file_of_another_user_is_ignored(tmp_path, answering_port, monkeypatch):
+    path = tmp_path / "state.json"
+    write_state_file(path, 0o600)
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(path).st_uid + 1)
+    assert browser_server.server_endpoint(str(path)) is None
+
+
+def test_state_is_written_private_even_over_an_open_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_state_file(path, 0o666)
+    browser = {"process": type("Process", (), {"pid": 42})(), "started": 0.0}
+    browser_server.write_state(str(path), 9333, browser)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert browser_server.read_state(str(path))["browser_pid"] == 42
+
+
+def test_missing_or_broken_state_file(tmp_path, answering_port):
+    assert browser_server.server_endpoint(str(tmp_path / "missing.json")) is None
+    path = tmp_path / "state.json"
+    path.write_text("[1, 2]", encoding="utf-8")
+    os.chmod(path, 0o600)
+    assert browser_server.server_endpoint(str(path)) is None
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import concurrency
+from concurrency import AdaptiveLimiter
+
+
+@pytest.fixture(autouse=True)
+def idle_machine(monkeypatch):
+    monkeypatch.setattr(concurrency, "resource_pressure", lambda: None)
+
+
+def test_limit_grows_by_one_per_window_of_successes():
+    limiter = AdaptiveLimiter(2, maximum=4)
+    for _ in range(2):
+        limiter.record(True, 1.0)
+    assert limiter.limit == 3
+    for _ in range(3):
+        limiter.record(True, 1.0)
+    assert limiter.limit == 4
+    for _ in range(10):
+        limiter.record(True, 1.0)
+    assert limiter.limit == 4
+
+
+def test_failure_halves_once_per_cooldown():
+    changes = []
+    limiter = AdaptiveLimiter(8, on_change=lambda old, new, reason: changes.append((old, new)))
+    limiter.record(False)
+    limiter.record(False)  # same burst, within the cooldown
+    assert limiter.limit == 4
+    assert changes == [(8, 4)]
+
+    limiter.last_decrease -= concurrency.DEFAULT_COOLDOWN + 1
+    limiter.record(False)
+    assert limiter.limit == 2
+
+
+def test_limit_never_drops_below_minimum():
+    limiter = AdaptiveLimiter(1, minimum=1)
+    limiter.record(False)
+    assert limiter.limit == 1
+
+
+def test_rising_latency_backs_off():
+    limiter = AdaptiveLimiter(8)
+    for _ in range(3):
+        limiter.record(True, 1.0)
+    for _ in range(6):
+        limiter.record(True, 10.0)
+    assert limiter.limit == 4
+
+
+def test_machine_under_pressure_stops_growth(monkeypatch):
+    monkeypatch.setattr(concurrency, "resource_pressure", lambda: "CPU load 3.0 per core")
+    limiter = AdaptiveLimiter(4, maximum=8)
+    for _ in range(8):
+        limiter.record(True, 1.0)
+    assert limiter.limit == 2
+
+
+@pytest.mark.parametrize("status, backs_off", [(200, False), (404, False), (429, True), (503, True)])
+def test_throttling_responses_back_off(status, backs_off):
+    limiter = AdaptiveLimiter(4)
+    limiter.observe_response(SimpleNamespace(status=status, url="https://portal.test/x"))
+    assert (limiter.limit == 2) == backs_off
+
+
+def test_no_more_than_limit_slots_at_once():
+    async def run():
+        limiter = AdaptiveLimiter(2)
+        running = peak = 0
+
+        async def job():
+            nonlocal running, peak
+            async with limiter.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(job() for _ in range(6)))
+        return peak, limiter.active
+
+    assert asyncio.run(run()) == (2, 0)
@@ -0,0 +1,53 @@
+from new_app import BASE_URL, parse_draft_links
+
+
+def listing(*articles, outside=""):
+    return f'<html><body>{outside}<div id="ApplicationListResults">{"".join(articles)}</div></body></html>'
+
+
+def article(href, updated="Updated 1 May", text="Complete your application"):
+    return f'<article><h3>Vacancy</h3><p>{updated}</p><a href="{href}">{text}</a></article>'
+
+
+def test_relative_links_get_the_portal_prefix():
+    links = parse_draft_links(listing(article("/application/1"), article("https://other.test/application/2")))
+    assert [url for url, _ in links] == [f"{BASE_URL}/application/1", "https://other.test/application/2"]
+
+
+def test_only_draft_links_inside_the_results_count():
+    html = listing(
+        article("/application/1"),
+        article("/vacancy/1", text="View vacancy"),
+        '<article><a href="/application/3">Complete\n   your   <b>application</b></a></article>',
+        outside=article("/application/9"),
+    )
+    assert [url for url, _ in parse_draft_links(html)] == [f"{BASE_URL}/application/1", f"{BASE_URL}/application/3"]
+
+
+def test_marker_follows_the_article_text():
+    (_, before), = parse_draft_links(listing(article("/application/1", "Updated 1 May")))
+    (_, same), = parse_draft_links(listing(article("/application/1", "Updated 1 May")))
+    (_, after), = parse_draft_links(listing(article("/application/1", "Updated 2 May")))
+    assert before == same
+    assert before != after
+
+
+def test_nested_article_belongs_to_the_outer_entry():
+    html = listing(
+        '<article><h3>Vacancy</h3><article><p>Closing soon</p></article>'
+        '<p>Updated 1 May</p><a href="/application/1">Complete your application</a></article>'
+    )
+    changed = html.replace("Updated 1 May", "Updated 2 May")
+    (url, marker), = parse_draft_links(html)
+    assert url == f"{BASE_URL}/application/1"
+    assert parse_draft_links(changed)[0][1] != marker
+
+
+def test_unclosed_tags_and_void_elements_are_tolerated():
+    html = listing('<article><img src="x.png"><p>Updated<br>1 May<a href="/application/1">Complete your application</a>'
+                   '</article>', article("/application/2"))
+    assert [url for url, _ in parse_draft_links(html)] == [f"{BASE_URL}/application/1", f"{BASE_URL}/application/2"]
+
+
+def test_empty_page():
+    assert parse_draft_links(listing()) == []
@@ -0,0 +1,54 @@
+import asyncio
+import os
+
+import jd_cache
+import new_app
+
+
+def test_stored_description_is_read_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(jd_cache, "memory", {})
+    jd_cache.store_job_description("vacancy:1", "Staff nurse", str(tmp_path))
+    jd_cache.memory.clear()
+
+    assert jd_cache.get_job_description("vacancy:1", str(tmp_path)) == "Staff nurse"
+    assert jd_cache.get_job_description("vacancy:2", str(tmp_path)) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(jd_cache, "memory", {})
+    for number in range(3):
+        jd_cache.store_job_description(f"vacancy:{number}", f"text {number}", str(tmp_path), max_entries=3)
+        path = jd_cache.cache_path(f"vacancy:{number}", str(tmp_path))
+        os.utime(path, (number, number))
+
+    # reading vacancy 0 makes it the most recently used entry
+    jd_cache.memory.clear()
+    assert jd_cache.get_job_description("vacancy:0", str(tmp_path)) == "text 0"
+    jd_cache.store_job_description("vacancy:3", "text 3", str(tmp_path), max_entries=3)
+
+    assert jd_cache.get_job_description("vacancy:1", str(tmp_path)) is None
+    for number in (0, 2, 3):
+        assert jd_cache.get_job_description(f"vacancy:{number}", str(tmp_path)) == f"text {number}"
+
+
+class DraftPage:
+    def __init__(self, info):
+        self.info = info
+
+    async def evaluate(self, script, *args):
+        return self.info
+
+
+def test_draft_without_vacancy_id_skips_the_cache(monkeypatch):
+    lookups = []
+
+    def get(key):
+        lookups.append(key)
+        return "another vacancy's description"
+
+    monkeypatch.setattr(new_app, "get_job_description", get)
+    monkeypatch.setattr(new_app, "store_job_description", lambda key, text: lookups.append(key))
+    page = DraftPage({"key": None, "text": "This vacancy's description", "url": None})
+
+    assert asyncio.run(new_app.extract_job_description(page, "a")) == "This vacancy's description"
+    assert lookups == []
@@ -0,0 +1,63 @@
+import journal
+
+
+def write(path, *rows):
+    journal.open_journal(str(path))
+    try:
+        for row in rows:
+            row()
+    finally:
+        journal.close_journal()
+
+
+def test_progress_keeps_latest_state_and_done_sections(tmp_path):
+    db = tmp_path / "progress.db"
+    write(
+        db,
+        lambda: journal.record("a", "u1", journal.STARTED),
+        lambda: journal.record("a", "u1", journal.SECTION_DONE, "equalops"),
+        lambda: journal.record("a", "u1", journal.DRAFT_FAILED),
+        lambda: journal.record("a", "u2", journal.DRAFT_DONE),
+        lambda: journal.record("b", "u3", journal.DRAFT_DONE),
+    )
+
+    progress = journal.load_progress("a", str(db))
+
+    assert progress == {
+        "u1": {"state": journal.DRAFT_FAILED, "sections": {"equalops"}},
+        "u2": {"state": journal.DRAFT_DONE, "sections": set()},
+    }
+
+
+def test_index_is_ignored_until_a_discovery_finished(tmp_path):
+    db = tmp_path / "progress.db"
+    write(
+        db,
+        lambda: journal.record_discovery("a", False),
+        lambda: journal.record_draft_seen("a", "u1", "m1"),
+    )
+    assert journal.load_draft_index("a", str(db)) == {}
+
+    write(db, lambda: journal.record_discovery("a", True))
+    assert journal.load_draft_index("a", str(db)) == {"u1": "m1"}
+    assert journal.load_draft_index("b", str(db)) == {}
+
+
+def test_forgotten_draft_leaves_the_index(tmp_path):
+    db = tmp_path / "progress.db"
+    write(
+        db,
+        lambda: journal.record_draft_seen("a", "u1", "m1"),
+        lambda: journal.record_draft_seen("a", "u2", "m2"),
+        lambda: journal.record_discovery("a", True),
+        lambda: journal.forget_draft("a", "u1"),
+    )
+
+    assert journal.load_draft_index("a", str(db)) == {"u2": "m2"}
+
+
+def test_old_index_entries_expire(tmp_path):
+    db = tmp_path / "progress.db"
+    write(db, lambda: journal.record_draft_seen("a", "u1", "m1"), lambda: journal.record_discovery("a", True))
+
+    assert journal.load_draft_index("a", str(db), max_age=-1) == {}
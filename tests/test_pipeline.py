@@ -0,0 +1,191 @@
+import asyncio
+
+import new_app
+from concurrency import AdaptiveLimiter
+
+
+class CrashedContext:
+    def on(self, event, handler):
+        pass
+
+    async def new_page(self):
+        raise RuntimeError("Target closed: browser has crashed")
+
+    async def close(self):
+        pass
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, **options):
+        pass
+
+    async def evaluate(self, script, *args):
+        return None
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext(CrashedContext):
+    async def new_page(self):
+        return FakePage()
+
+
+def fake_discovery(pages):
+    async def discover_drafts(context, app_id, ramp_up=False):
+        for number in range(pages):
+            yield [(f"{new_app.BASE_URL}/draft/{number}-{i}", "m") for i in range(new_app.DRAFTS_PER_PAGE)]
+    return discover_drafts
+
+
+def test_account_finishes_when_no_tab_opens(monkeypatch):
+    async def open_context(browser, email, password, app_id):
+        return CrashedContext()
+
+    monkeypatch.setattr(new_app, "open_authenticated_context", open_context)
+    monkeypatch.setattr(new_app, "discover_drafts", fake_discovery(5))
+    monkeypatch.setattr(new_app, "INCREMENTAL_DISCOVERY", False)
+    monkeypatch.setattr(new_app.journal, "load_progress", lambda app_id: {})
+    monkeypatch.setattr(new_app, "remaining_drafts", 0)
+
+    limiter = AdaptiveLimiter(2, maximum=2)
+    # more drafts than the queue holds, so discovery would block on a full queue
+    asyncio.run(asyncio.wait_for(new_app.process_account(None, "a@example.com", "pw", limiter), 5))
+
+    assert new_app.status_dict["a@example.com"] == "Tab workers stopped before discovery finished"
+    assert new_app.remaining_drafts == 0
+
+
+def test_every_discovered_draft_reaches_a_worker(monkeypatch):
+    handled = []
+
+    async def handle(page, url, app_id, done_sections=(), reauth=None):
+        handled.append(url)
+        await asyncio.sleep(0)
+        return True
+
+    monkeypatch.setattr(new_app, "handle_draft_application", handle)
+    monkeypatch.setattr(new_app, "discover_drafts", fake_discovery(5))
+    monkeypatch.setattr(new_app, "INCREMENTAL_DISCOVERY", False)
+    monkeypatch.setattr(new_app, "remaining_drafts", 0)
+
+    async def run():
+        limiter = AdaptiveLimiter(2, maximum=3)
+        queue = asyncio.Queue(maxsize=new_app.DISCOVERY_QUEUE_SIZE)
+        producer = asyncio.create_task(new_app.feed_drafts(FakeContext(), "a", {}, queue, 3))
+        await new_app.apply_to_drafts(FakeContext(), queue, "a", limiter, 3)
+        return await producer
+
+    queued, finished = asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert (queued, finished) == (50, 0)
+    assert len(handled) == len(set(handled)) == 50
+    assert new_app.remaining_drafts == 0
+
+
+def listed_drafts(count, changed=()):
+    return [(f"{new_app.BASE_URL}/draft/{i}", "new" if i in changed else f"m{i}") for i in range(count)]
+
+
+def run_discovery(monkeypatch, drafts, progress=None, parts=1, fail_on_page=None):
+    fetched = []
+
+    async def discover_drafts(context, app_id, ramp_up=False):
+        for start in range(0, len(drafts), new_app.DRAFTS_PER_PAGE):
+            if len(fetched) + 1 == fail_on_page:
+                raise Exception("HTTP 503 for page")
+            fetched.append(start)
+            yield drafts[start:start + new_app.DRAFTS_PER_PAGE]
+
+    monkeypatch.setattr(new_app, "discover_drafts", discover_drafts)
+    monkeypatch.setattr(new_app, "INCREMENTAL_DISCOVERY", True)
+
+    async def run():
+        queue = asyncio.Queue()
+        result = await new_app.feed_drafts(None, "a", progress or {}, queue, 1, 0, parts)
+        urls = []
+        while (url := queue.get_nowait()) is not None:
+            urls.append(url)
+        return result, urls
+
+    new_app.journal.open_journal()
+    try:
+        (queued, finished), urls = asyncio.run(run())
+    finally:
+        new_app.journal.close_journal()
+    return urls, len(fetched)
+
+
+def test_incremental_discovery_stops_at_the_first_unchanged_draft(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    drafts = listed_drafts(35)
+    done = {url: {"state": new_app.journal.DRAFT_DONE} for url, _marker in drafts}
+
+    urls, fetched = run_discovery(monkeypatch, drafts, done)
+    assert (urls, fetched) == ([], 4)
+
+    # draft 0 was updated since, everything below it was not
+    urls, fetched = run_discovery(monkeypatch, listed_drafts(35, changed={0}), done)
+    assert fetched == 1
+    assert urls == []
+
+    del done[drafts[0][0]]
+    urls, fetched = run_discovery(monkeypatch, listed_drafts(35, changed={0}), done)
+    assert urls == [drafts[0][0]]
+
+
+def test_interrupted_discovery_is_not_trusted(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    drafts = listed_drafts(35)
+
+    urls, fetched = run_discovery(monkeypatch, drafts, fail_on_page=2)
+    assert fetched == 1
+
+    # page 2 and later were never indexed, so the next run walks the whole list
+    urls, fetched = run_discovery(monkeypatch, drafts)
+    assert fetched == 4
+    assert len(urls) == 35
+
+
+def test_known_drafts_that_failed_before_are_dropped(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    drafts = listed_drafts(20)
+    run_discovery(monkeypatch, drafts)
+
+    # drafts 10-19 are gone from the list (e.g. submitted); 10 failed last run
+    progress = {url: {"state": new_app.journal.DRAFT_DONE} for url, _marker in drafts[1:10]}
+    progress[drafts[10][0]] = {"state": new_app.journal.DRAFT_FAILED}
+    urls, fetched = run_discovery(monkeypatch, drafts[:10], progress)
+    assert fetched == 1
+    assert drafts[10][0] not in urls
+    assert urls == [drafts[0][0]] + [url for url, _marker in drafts[11:20]]
+
+    assert drafts[10][0] not in new_app.journal.load_draft_index("a")
+
+
+def test_accounts_shared_by_processes_walk_the_whole_list(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    drafts = listed_drafts(35)
+    run_discovery(monkeypatch, drafts)
+
+    urls, fetched = run_discovery(monkeypatch, drafts, parts=2)
+    assert fetched == 4
+    assert set(urls) == {url for url, _marker in drafts if new_app.draft_shard(url, 2) == 0}
+
+
+def test_page_state_overrides_the_journal(monkeypatch):
+    monkeypatch.setattr(new_app, "DRAFT_SECTIONS", ["personal", "references", "equalops"])
+    status = {"personal": False, "references": True, "equalops": None}
+
+    assert new_app.pending_sections(status) == ["personal", "equalops"]
+    # the journal only settles sections the page says nothing about
+    assert new_app.pending_sections(status, {"personal", "equalops"}) == ["personal"]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from readiness import click_and_wait
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.ok = 200 <= status < 400
+        self.url = "https://portal.test/application/1/save"
+
+
+class FakeLocator:
+    def __init__(self, page):
+        self.page = page
+
+    async def count(self):
+        return self.page.toasts
+
+    async def click(self, timeout=None):
+        self.page.click_timeout = timeout
+        self.page.clicked.set()
+
+
+class FakeSavePage:
+    """Answers the click with a save response of the given status, or not at all."""
+
+    def __init__(self, status=None, toasts=0):
+        self.status = status
+        self.toasts = toasts
+        self.toast_arg = None
+        self.click_timeout = None
+        self.clicked = asyncio.Event()
+
+    def locator(self, selector):
+        return FakeLocator(self)
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        await self.clicked.wait()
+        if self.status is None:
+            await asyncio.sleep(timeout / 1000)
+            raise Exception("Timeout waiting for response")
+        return FakeResponse(self.status)
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        self.toast_arg = arg
+        await asyncio.sleep(timeout / 1000)
+        raise Exception("Timeout waiting for function")
+
+
+def click(page, timeout=200):
+    return asyncio.run(click_and_wait(page, FakeLocator(page), timeout=timeout))
+
+
+def test_successful_save_is_ready():
+    page = FakeSavePage(status=200)
+    assert click(page).result().status == 200
+    assert page.click_timeout == 200
+
+
+def test_failed_save_raises_with_its_status():
+    with pytest.raises(Exception, match="HTTP 503"):
+        click(FakeSavePage(status=503))
+
+
+def test_no_reaction_raises_timeout():
+    with pytest.raises(TimeoutError):
+        click(FakeSavePage(), timeout=50)
+
+
+def test_only_a_new_toast_counts():
+    page = FakeSavePage(status=200, toasts=1)
+    click(page)
+    assert page.toast_arg[1] == 1
@@ -0,0 +1,63 @@
+import fnmatch
+from types import SimpleNamespace
+
+import pytest
+
+import resource_blocking
+from resource_blocking import blocked_url_patterns, count_request, make_rules, should_block
+
+
+@pytest.mark.parametrize("resource_type, url, blocked", [
+    ("image", "https://apps.trac.jobs/static/logo.png", True),
+    ("font", "https://fonts.example.com/a.woff2", True),
+    ("script", "https://www.google-analytics.com/analytics.js", True),
+    ("xhr", "https://px.ads.linkedin.com/collect", True),
+    ("document", "https://apps.trac.jobs/application/1", False),
+    ("stylesheet", "https://apps.trac.jobs/static/portal.css", False),
+    ("script", "https://notgoogle-analytics.com/x.js", False),
+])
+def test_should_block(resource_type, url, blocked):
+    assert should_block(make_rules(), resource_type, url) == blocked
+
+
+def test_allowed_hosts_win():
+    rules = make_rules(allow_hosts={"cdn.trac.jobs", "hotjar.com"})
+    assert not should_block(rules, "image", "https://cdn.trac.jobs/logo.png")
+    assert not should_block(rules, "script", "https://static.hotjar.com/c.js")
+
+
+# Network.setBlockedURLs patterns: "*" matches any run of characters
+def cdp_blocks(patterns, url):
+    return any(fnmatch.fnmatchcase(url, pattern) for pattern in patterns)
+
+
+@pytest.mark.parametrize("url, blocked", [
+    ("https://apps.trac.jobs/static/logo.png", True),
+    ("https://apps.trac.jobs/static/logo.png?v=3", True),
+    ("https://fonts.example.com/a.woff2", True),
+    ("https://www.googletagmanager.com/gtm.js?id=1", True),
+    ("https://doubleclick.net/pixel", True),
+    ("https://apps.trac.jobs/application/1", False),
+    ("https://apps.trac.jobs/static/portal.css", False),
+    ("https://apps.trac.jobs/static/portal.js", False),
+])
+def test_cdp_patterns_follow_the_rules(url, blocked):
+    assert cdp_blocks(blocked_url_patterns(make_rules()), url) == blocked
+
+
+def test_allowed_hosts_are_left_out_of_the_patterns():
+    patterns = blocked_url_patterns(make_rules(allow_hosts={"hotjar.com"}))
+    assert not cdp_blocks(patterns, "https://static.hotjar.com/c/hotjar.js")
+
+
+def test_blocked_requests_are_counted_with_an_estimate(monkeypatch):
+    monkeypatch.setattr(resource_blocking, "blocking_stats", {})
+    resource_blocking.reset_stats()
+    count_request(SimpleNamespace(resource_type="image"), "net::ERR_BLOCKED_BY_CLIENT")
+    count_request(SimpleNamespace(resource_type="document"), None)
+    count_request(SimpleNamespace(resource_type="xhr"), "net::ERR_CONNECTION_RESET")
+
+    stats = resource_blocking.blocking_stats
+    assert (stats["blocked"], stats["allowed"], stats["by_type"]) == (1, 2, {"image": 1})
+    assert stats["estimated_bytes_saved"] == resource_blocking.ESTIMATED_BYTES["image"]
+    assert "estimated" in resource_blocking.format_stats()
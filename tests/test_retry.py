@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import retry
+import sections
+from retry import (
+    AUTH_LOST, RETRY_POLICIES, SELECTOR_TIMEOUT, TRANSIENT_NETWORK, UNKNOWN, VALIDATION,
+    AuthenticationLost, ValidationFailed, backoff_delay, classify_error, take_retry,
+)
+
+
+@pytest.mark.parametrize("error, kind", [
+    (Exception("HTTP 503 from https://portal.test/save"), TRANSIENT_NETWORK),
+    (Exception("HTTP 429 from https://portal.test/save"), TRANSIENT_NETWORK),
+    (Exception("net::ERR_CONNECTION_RESET at https://portal.test"), TRANSIENT_NETWORK),
+    (TimeoutError("No save, toast or next fieldset within 10000 ms of the click"), SELECTOR_TIMEOUT),
+    (AuthenticationLost(), AUTH_LOST),
+    (ValidationFailed(), VALIDATION),
+    (Exception("HTTP 400 from https://portal.test/save"), UNKNOWN),
+    (ValueError("No elements for: #x"), UNKNOWN),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_budget_is_per_class():
+    budget = {}
+    granted = [take_retry(budget, SELECTOR_TIMEOUT) for _ in range(RETRY_POLICIES[SELECTOR_TIMEOUT]["retries"] + 1)]
+    assert granted == [True] * RETRY_POLICIES[SELECTOR_TIMEOUT]["retries"] + [False]
+    assert take_retry(budget, TRANSIENT_NETWORK)
+    assert not take_retry({}, VALIDATION)
+
+
+def test_backoff_grows_and_stays_capped():
+    policy = RETRY_POLICIES[TRANSIENT_NETWORK]
+    for attempt in range(1, 10):
+        delay = backoff_delay(TRANSIENT_NETWORK, attempt)
+        expected = min(policy["max_delay"], policy["base_delay"] * 2 ** (attempt - 1))
+        assert expected * (1 - policy["jitter"]) <= delay <= expected * (1 + policy["jitter"])
+
+
+class ReloadablePage:
+    def __init__(self):
+        self.reloads = 0
+        self.url = "https://portal.test/application/1"
+
+    async def reload(self, **options):
+        self.reloads += 1
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def wait_for_selector(self, selector, **options):
+        pass
+
+
+def test_failed_save_backs_off_and_reloads_the_section(monkeypatch):
+    ran = []
+
+    async def run_step(page, step):
+        ran.append(step["name"])
+        if step["name"] == "final_save" and ran.count("final_save") == 1:
+            raise Exception("HTTP 503 from https://portal.test/application/1/save")
+
+    monkeypatch.setattr(sections, "run_step", run_step)
+    monkeypatch.setattr(retry, "backoff_delay", lambda kind, attempt: 0)
+    page = ReloadablePage()
+
+    assert asyncio.run(sections.run_section(page, "equalops", on_status=lambda message: None))
+    assert page.reloads == 1
+    # the reload starts the section over
+    assert ran.count("start") == 2
+    assert ran.count("final_save") == 2
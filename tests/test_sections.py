@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+import sections
+
+HANDLED_ACTIONS = {"click", "select", "bulk_fill", "save_next", "save_next_while_visible", "save", "close_toast", "reload"}
+
+
+@pytest.mark.parametrize("name", sorted(sections.SECTION_SPECS))
+def test_every_section_compiles_to_handled_actions(name):
+    label, steps = sections.compile_section(name)
+    assert label
+    for step in steps:
+        assert step["action"] in HANDLED_ACTIONS
+        assert step["timeout"] > 0
+        if step["action"] == "bulk_fill":
+            assert step["fields"]
+
+
+def test_unknown_action_is_rejected():
+    step = {"action": "check", "locate": None, "timeout": 1000}
+    with pytest.raises(ValueError, match="Unknown step action"):
+        asyncio.run(sections.run_step(object(), step))
+
+
+class FillPage:
+    def __init__(self, matched):
+        self.matched = matched
+
+    async def evaluate(self, script, fields):
+        return {selector: {"matched": selector in self.matched, "changed": 0} for selector, _ in fields}
+
+
+def test_bulk_fill_reports_missing_fields():
+    page = FillPage({"#a"})
+    with pytest.raises(ValueError, match="#b"):
+        asyncio.run(sections.bulk_fill(page, {"#a": "1", "#b": "2"}))
+    assert asyncio.run(sections.bulk_fill(page, {"#a": "1"}))["#a"]["matched"]
@@ -0,0 +1,71 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import session_store
+
+
+class SavedContext:
+    def __init__(self, logged_in):
+        self.logged_in = logged_in
+        self.closed = False
+        self.request = self
+
+    async def get(self, url, timeout=None):
+        landed = url if self.logged_in else f"{session_store.BASE_URL}/"
+        return SimpleNamespace(ok=True, url=landed)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_session_file_is_per_portal_and_account(monkeypatch):
+    path = session_store.session_state_path("Someone@Example.com ")
+    assert path == session_store.session_state_path("someone@example.com")
+    assert path != session_store.session_state_path("other@example.com")
+
+    monkeypatch.setattr(session_store, "BASE_URL", "http://127.0.0.1:8765")
+    assert session_store.session_state_path("someone@example.com") != path
+
+
+def restore(tmp_path, monkeypatch, logged_in, saved=True):
+    monkeypatch.setattr(session_store, "SESSION_DIR", str(tmp_path))
+    if saved:
+        with open(session_store.session_state_path("a@example.com"), "w") as f:
+            f.write("{}")
+    created = []
+
+    async def new_context(**options):
+        created.append(options)
+        return SavedContext(logged_in)
+
+    messages = []
+    context = asyncio.run(session_store.restore_session(new_context, "a@example.com", messages.append))
+    return context, created, messages
+
+
+def test_valid_saved_session_is_reused(tmp_path, monkeypatch):
+    context, created, messages = restore(tmp_path, monkeypatch, logged_in=True)
+    assert context is not None and not context.closed
+    assert created == [{"storage_state": session_store.session_state_path("a@example.com")}]
+
+
+def test_expired_session_is_closed(tmp_path, monkeypatch):
+    context, created, messages = restore(tmp_path, monkeypatch, logged_in=False)
+    assert context is None
+    assert messages[-1] == "Saved session expired, logging in again"
+
+
+def test_missing_session_opens_nothing(tmp_path, monkeypatch):
+    context, created, messages = restore(tmp_path, monkeypatch, logged_in=True, saved=False)
+    assert (context, created) == (None, [])
+
+
+def test_both_apps_use_the_shared_store():
+    import main
+    import new_app
+
+    assert main.restore_session_sync is session_store.restore_session_sync
+    assert new_app.restore_session is session_store.restore_session
+    assert not hasattr(main, "session_state_path") and not hasattr(new_app, "session_state_path")
+    assert os.path.basename(session_store.SESSION_DIR) == "sessions"
@@ -0,0 +1,48 @@
+from collections import Counter
+
+import pytest
+
+from new_app import draft_shard
+from sharding import plan_shards, split_evenly
+
+
+@pytest.mark.parametrize("total, count, expected", [
+    (12, 4, [3, 3, 3, 3]),
+    (10, 4, [3, 3, 2, 2]),
+    (2, 4, [1, 1, 1, 1]),  # every process gets at least one tab
+    (7, 1, [7]),
+])
+def test_split_evenly(total, count, expected):
+    assert split_evenly(total, count) == expected
+
+
+ACCOUNTS = [(f"user{i}@example.com", "secret") for i in range(5)]
+
+
+def test_more_accounts_than_processes_are_dealt_round_robin():
+    shards = plan_shards(ACCOUNTS, 2)
+    assert [[email for email, _, _, _ in shard] for shard in shards] == [
+        ["user0@example.com", "user2@example.com", "user4@example.com"],
+        ["user1@example.com", "user3@example.com"],
+    ]
+    assert all(part == 0 and parts == 1 for shard in shards for _, _, part, parts in shard)
+
+
+def test_fewer_accounts_than_processes_share_each_account():
+    shards = plan_shards(ACCOUNTS[:2], 5)
+    assert len(shards) == 5
+    assert all(len(shard) == 1 for shard in shards)
+    entries = [shard[0] for shard in shards]
+    assert Counter(email for email, _, _, _ in entries) == {"user0@example.com": 3, "user1@example.com": 2}
+    for email in ("user0@example.com", "user1@example.com"):
+        parts = [(part, parts) for e, _, part, parts in entries if e == email]
+        assert sorted(part for part, _ in parts) == list(range(len(parts)))
+        assert {count for _, count in parts} == {len(parts)}
+
+
+def test_every_draft_belongs_to_exactly_one_part():
+    urls = [f"https://portal.test/application/{i}" for i in range(200)]
+    for parts in (1, 2, 3):
+        owners = [[part for part in range(parts) if draft_shard(url, parts) == part] for url in urls]
+        assert all(len(owner) == 1 for owner in owners)
+        assert len({owner[0] for owner in owners}) == parts
@@ -0,0 +1,100 @@
+import asyncio
+
+from tab_pool import TabPool
+
+
+class FakeCDPSession:
+    def __init__(self):
+        self.heap = 10_000_000
+
+    async def send(self, method, params=None):
+        if method == "Performance.getMetrics":
+            return {"metrics": [{"name": "Nodes", "value": 1}, {"name": "JSHeapUsedSize", "value": self.heap}]}
+        return {}
+
+    async def detach(self):
+        pass
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, **options):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.sessions = {}
+
+    async def new_page(self):
+        return FakePage()
+
+    async def new_cdp_session(self, page):
+        return self.sessions.setdefault(page, FakeCDPSession())
+
+
+def test_pools_share_one_tab_budget():
+    async def run():
+        open_tabs = {"count": 0}
+        first, second = TabPool(FakeContext(), open_tabs=open_tabs), TabPool(FakeContext(), open_tabs=open_tabs)
+        await asyncio.gather(first.warm(4, limit=4), second.warm(4, limit=4))
+        warmed = len(first.idle) + len(second.idle)
+
+        # a busy tab in one pool pushes the other's idle tabs over the limit
+        page = await first.acquire()
+        await second.acquire()
+        await first.release(page)
+        await first.trim(3)
+        await second.trim(3)
+        return warmed, open_tabs["count"]
+
+    warmed, count = asyncio.run(run())
+    assert warmed == 4
+    assert count == 3
+
+
+def test_tab_with_grown_heap_is_replaced():
+    async def run():
+        context = FakeContext()
+        pool = TabPool(context, max_heap_growth=1_000_000)
+        page = await pool.acquire()
+        await pool.release(page)  # first release records the baseline
+        assert pool.idle == [page]
+
+        page = await pool.acquire()
+        context.sessions[page].heap += 2_000_000
+        await pool.release(page)
+        return page, pool
+
+    page, pool = asyncio.run(run())
+    assert page.closed
+    assert pool.idle == []
+    assert pool.recycled == 1
+    assert pool.open_tabs["count"] == 0
+
+
+def test_worn_and_closed_tabs_are_not_handed_out():
+    async def run():
+        pool = TabPool(FakeContext(), max_uses=1)
+        page = await pool.acquire()
+        await pool.release(page)  # used up
+        other = await pool.acquire()
+        await pool.release(other, reusable=True)
+        other.closed = True  # e.g. the renderer crashed while idle
+        return page, other, await pool.acquire(), pool
+
+    page, other, fresh, pool = asyncio.run(run())
+    assert page.closed
+    assert fresh is not page and fresh is not other
+    assert pool.open_tabs["count"] == 1
@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+# Lightweight latency spans.
+#
+#   with span("goto", url=url):
+#       await page.goto(url)
+#
+# Each finished span is appended to a list (an atomic operation, so spans can
+# be recorded from any task or thread). At the end of a run the spans are
+# grouped by name into p50/p95/max summaries, and they can be written out as
+# a Chrome trace (chrome://tracing or https://ui.perfetto.dev).
+
+origin = time.perf_counter()
+origin_wall = time.time()  # lets spans from other processes be put on the same clock
+spans = []
+track_ids = {}
+track_lock = threading.Lock()
+
+
+# function to name the track a span belongs to: the asyncio task or the thread
+def current_track():
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task is not None else threading.current_thread().name
+
+
+# function to give each track a small integer id for the trace viewer
+def track_id(track):
+    with track_lock:
+        return track_ids.setdefault(track, len(track_ids) + 1)
+
+
+# context manager that records one span; set item["ok"] = False to flag a soft failure
+@contextlib.contextmanager
+def span(name, category="automation", **args):
+    start = time.perf_counter()
+    item = {"name": name, "cat": category, "start": start - origin, "ok": True, "args": args}
+    try:
+        yield item
+    except BaseException:
+        item["ok"] = False
+        raise
+    finally:
+        item["dur"] = time.perf_counter() - start
+        item["track"] = current_track()
+        spans.append(item)
+
+
+# function to forget the spans of a previous run
+def reset_spans():
+    spans.clear()
+
+
+# function to add spans recorded in another process (see sharding.py)
+def merge_spans(recorded, other_origin_wall, track_prefix):
+    shift = other_origin_wall - origin_wall
+    for item in recorded:
+        spans.append(dict(item, start=item["start"] + shift, track=f"{track_prefix} / {item['track']}"))
+
+
+# function to pick a percentile from sorted values (nearest rank)
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+# function to group spans by name into latency statistics
+def summarize(recorded=None):
+    groups = {}
+    for item in spans if recorded is None else recorded:
+        groups.setdefault(item["name"], []).append(item)
+
+    summary = []
+    for name, items in groups.items():
+        durations = sorted(item["dur"] for item in items)
+        summary.append({
+            "name": name,
+            "count": len(items),
+            "failed": sum(1 for item in items if not item["ok"]),
+            "total": sum(durations),
+            "p50": percentile(durations, 0.50),
+            "p95": percentile(durations, 0.95),
+            "max": durations[-1],
+        })
+    summary.sort(key=lambda row: row["total"], reverse=True)
+    return summary
+
+
+# function to render the summary as a fixed-width table
+def format_summary(recorded=None):
+    rows = summarize(recorded)
+    if not rows:
+        return "No timing spans recorded"
+
+    width = max(len("stage"), *(len(row["name"]) for row in rows))
+    lines = [f"{'stage':<{width}}  {'count':>6}  {'failed':>6}  {'total s':>9}  {'p50 s':>7}  {'p95 s':>7}  {'max s':>7}"]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<{width}}  {row['count']:>6}  {row['failed']:>6}  {row['total']:>9.2f}  "
+            f"{row['p50']:>7.2f}  {row['p95']:>7.2f}  {row['max']:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+# function to write the spans in Chrome trace event format
+def export_chrome_trace(path, recorded=None):
+    pid = os.getpid()
+    trace_events = []
+    named_tracks = set()
+
+    for item in spans if recorded is None else recorded:
+        tid = track_id(item["track"])
+        if tid not in named_tracks:
+            named_tracks.add(tid)
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                                 "args": {"name": item["track"]}})
+        trace_events.append({
+            "name": item["name"],
+            "cat": item["cat"],
+            "ph": "X",
+            "ts": round(item["start"] * 1_000_000),
+            "dur": round(item["dur"] * 1_000_000),
+            "pid": pid,
+            "tid": tid,
+            "args": dict(item["args"], ok=item["ok"]),
+        })
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)